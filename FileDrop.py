@@ -1,28 +1,64 @@
-import sys, socket, struct, time, json, threading, itertools
-from pathlib import Path
-from typing import Dict, Tuple
+import sys, socket, struct, time, json, threading, itertools, mmap, select, heapq, selectors
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Tuple
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QLineEdit, QTabWidget,
     QVBoxLayout, QHBoxLayout, QFileDialog, QMessageBox, QListWidget,
     QListWidgetItem, QProgressBar, QDialog, QFormLayout, QSpinBox, QDoubleSpinBox, QDialogButtonBox, QTextEdit,
-    QToolButton, QStyle
+    QToolButton, QStyle, QCheckBox, QAbstractItemView
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
-from PyQt5.QtGui import QFont, QIcon
+from PyQt5.QtCore import (
+    Qt, QThread, pyqtSignal, QTimer, QObject, QRunnable, QThreadPool, QItemSelectionModel, QSignalBlocker
+)
+from PyQt5.QtGui import QFont, QIcon, QPalette, QColor
 
 import os
+import queue
 import stat
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 try:
     import paramiko
+    # Bigger SFTP READs (default 32 KiB) -> fewer request round trips. OpenSSH's
+    # sftp-server answers at most 255 KiB per READ; asking for more would come back
+    # short and drop prefetch into synchronous reads.
+    paramiko.SFTPFile.MAX_REQUEST_SIZE = 255 * 1024
 except ImportError:
     paramiko = None
+try:
+    import crc32c
+except ImportError:
+    crc32c = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import pyroute2  # Linux netlink, for address change notifications
+except ImportError:
+    pyroute2 = None
+try:
+    import ctypes
+    # fallocate(2) can reserve blocks without changing st_size; os.posix_fallocate cannot
+    _fallocate = ctypes.CDLL(None, use_errno=True).fallocate if sys.platform.startswith("linux") else None
+    if _fallocate is not None:
+        _fallocate.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64)
+except (ImportError, OSError, AttributeError):
+    _fallocate = None
+FALLOC_FL_KEEP_SIZE = 0x01
 ICON_PATH = os.path.abspath("assets/icon.png")
 
 SETTINGS_FILE = "settings.json"
 DEFAULT_SETTINGS = {
-    "BUFFER_SIZE": 64 * 1024,
+    "BUFFER_SIZE": 1024 * 1024,
     "ANNOUNCE_INTERVAL": 2.0,
-    "TCP_PORT": 5001
+    "TCP_PORT": 5001,
+    "SOCKET_BUFFER": 0,  # SO_SNDBUF/SO_RCVBUF override in bytes; 0 keeps kernel autotuning
+    "VERIFY_CRC": False,  # send a CRC32C trailer (receiver must run a version that knows CKSM)
+    "COMPRESS": False,  # zlib compression for the whole SSH session, every file included
 }
 
 # Settings 
@@ -38,13 +74,38 @@ def save_settings(settings):
 
 
 settings = load_settings()
+_settings_dirty = False  # set when the settings dialog is accepted; saved once at exit
 BUFFER_SIZE = settings["BUFFER_SIZE"]
 ANNOUNCE_INTERVAL = settings["ANNOUNCE_INTERVAL"]
 TCP_PORT = settings["TCP_PORT"]
+SOCKET_BUFFER = settings["SOCKET_BUFFER"]
+VERIFY_CRC = settings["VERIFY_CRC"]
+COMPRESS = settings["COMPRESS"]
 
 NOTE_HEADER = b'NOTE'  # 4‑byte header that marks a note message
 RESUME_HEADER = b'RESM'  # resume transfer
 CANCEL_HEADER = b'CNCL'  # cancel partial transfer
+CHECKSUM_HEADER = b'CKSM'  # prefix: file body is followed by a 4-byte CRC32C
+ANNOUNCE_MAGIC = b'FD01'  # binary discovery datagram
+ANNOUNCE_VERSION = 1
+ANNOUNCE_FMT = struct.Struct("!4sB4sB")  # magic, version, IPv4, name length; name bytes follow
+_U32 = struct.Struct("!I")  # name/note lengths, CRC32C trailer
+_U64 = struct.Struct("!Q")  # file sizes and resume offsets
+SENDFILE_CHUNK = 4 * 1024 * 1024  # bytes per sendfile() call
+ANNOUNCE_REFRESH = 30.0  # seconds between re-reading the local IP inside the announcer
+PROGRESS_INTERVAL = 0.05  # seconds between progress signals from transfer threads
+RECEIVE_WORKERS = 4  # incoming connections handled at once
+RECEIVE_TIMEOUT = 60  # seconds a sender may stall before its connection is dropped
+CONTROL_TIMEOUT = 2.0  # connect/send limit for note and cancel messages
+SCP_CHANNELS = 4  # parallel SFTP sessions per download
+SCP_PARALLEL_FILES = 2  # files fetched at once; x SCP_CHANNELS + browser session stays under OpenSSH MaxSessions (10)
+SCP_SPLIT_MIN = 8 * 1024 * 1024  # smaller files use a single session
+SCP_READ_CHUNK = 1024 * 1024  # readv() block size per session
+SFTP_WINDOW = 4 * 1024 * 1024  # SSH channel window for SFTP sessions
+SSH_KEEPALIVE = 30  # seconds between SSH keepalives while a browser session sits idle
+# AES-GCM first (AES-NI + PCLMULQDQ via OpenSSL), then CTR; encrypt-then-MAC first
+SSH_CIPHERS = ('aes128-gcm@openssh.com', 'aes256-gcm@openssh.com', 'aes128-ctr', 'aes256-ctr')
+SSH_MACS = ('hmac-sha2-256-etm@openssh.com', 'hmac-sha2-512-etm@openssh.com')
 SCP_MEMORY = {
     "ip": "",
     "port": 22,
@@ -63,9 +124,25 @@ def human_size(num):
     return f"{num:.1f} PB"
 
 
+_cached_ip = None  # kept current by AddressWatcherThread while it runs
+LOCAL_IP_TTL = 5.0  # without the watcher, re-resolve the local IP at most this often
+_polled_ip = (0.0, None)  # (expires_at, ip)
+
+
 def get_local_ip():
+    global _polled_ip
+    if _cached_ip:
+        return _cached_ip
+    expires_at, ip = _polled_ip
+    now = time.monotonic()
+    if now >= expires_at:
+        ip = _compute_local_ip()
+        _polled_ip = (now + LOCAL_IP_TTL, ip)
+    return ip
+
+
+def _compute_local_ip():
     # Prefer a private LAN IP (not VPN)
-    import socket
     try:
         # Try all interfaces for a private IP
         for iface in socket.getaddrinfo(socket.gethostname(), None):
@@ -82,6 +159,171 @@ def get_local_ip():
         return "0.0.0.0"
 
 
+def file_crc32c(path):
+    # crc32c runs in C (SSE4.2/ARMv8 CRC instructions) over the mapped file
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return crc32c.crc32c(b"")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return crc32c.crc32c(mm)
+
+
+def preallocate(fd, size):
+    # Reserve the blocks up front so the body lands in one extent instead of
+    # growing the file write by write. st_size must stay at what was actually
+    # written, even if the receiver dies: the .part size is the resume offset.
+    # Best effort; other platforms (and Windows) get nothing.
+    try:
+        if _fallocate is not None:
+            _fallocate(fd, FALLOC_FL_KEEP_SIZE, 0, size)  # nonzero (unsupported fs) is fine to ignore
+        elif sys.platform == "darwin" and fcntl is not None:
+            # fstore_t {flags=F_ALLOCATEALL, posmode=F_PEOFPOSMODE, offset, length, bytesalloc}
+            fcntl.fcntl(fd, getattr(fcntl, "F_PREALLOCATE", 42),
+                        struct.pack("IiqqQ", 4, 3, 0, max(size - os.fstat(fd).st_size, 0), 0))
+    except OSError:
+        pass
+
+
+def write_at(fd, data, pos):
+    view = memoryview(data)
+    while view:
+        if hasattr(os, "pwrite"):
+            n = os.pwrite(fd, view, pos)
+        else:  # Windows
+            os.lseek(fd, pos, os.SEEK_SET)
+            n = os.write(fd, view)
+        view = view[n:]
+        pos += n
+
+
+def create_unique_part(parent, name):
+    """Create the .part file for the first free "name", "name (1)", ... in parent.
+
+    The directory is listed once; O_EXCL settles races with another receiver.
+    Returns (final_path, part_path, fd).
+    """
+    parent = Path(parent)
+    base, ext = Path(name).stem, Path(name).suffix
+    try:
+        taken = {e.name for e in os.scandir(parent)}
+    except OSError:
+        taken = set()
+    for counter in itertools.count():
+        candidate = f"{base} ({counter}){ext}" if counter else name
+        if candidate in taken or candidate + ".part" in taken:
+            continue
+        part_path = parent / (candidate + ".part")
+        try:
+            fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o644)
+        except FileExistsError:
+            continue
+        return parent / candidate, part_path, fd
+
+
+def tune_socket(sock, buffer_opt):
+    # Disable Nagle so headers go out at once. Only pin the kernel buffer
+    # (which turns off TCP autotuning) when the user asked for it.
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if SOCKET_BUFFER:
+            sock.setsockopt(socket.SOL_SOCKET, buffer_opt, SOCKET_BUFFER)
+    except OSError:
+        pass
+
+
+def set_recv_timeout(sock, seconds):
+    # SO_RCVTIMEO rather than settimeout(): the socket stays blocking, which splice() needs
+    try:
+        if sys.platform == "win32":
+            sock.settimeout(seconds)
+        else:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, struct.pack("ll", int(seconds), 0))
+    except OSError:
+        pass
+
+
+def send_control_message(ip, message):
+    """Deliver one NOTE/CANCEL message on its own connection."""
+    with socket.create_connection((ip, TCP_PORT), timeout=CONTROL_TIMEOUT) as sock:
+        sock.sendall(message)
+
+
+def recv_exact(sock, n):
+    """Read exactly n bytes; fewer only if the peer closed the connection first."""
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        r = sock.recv_into(view[got:], n - got)
+        if not r:
+            break
+        got += r
+    return bytes(view[:got])
+
+
+def pack_announce(ip, name):
+    name_b = name.encode()[:255]
+    return ANNOUNCE_FMT.pack(ANNOUNCE_MAGIC, ANNOUNCE_VERSION, socket.inet_aton(ip), len(name_b)) + name_b
+
+
+def pack_legacy_announce(ip, name):
+    # Releases before FD01 json.loads() every datagram and drop the rest; keep
+    # sending this alongside until those are gone from the LAN
+    return json.dumps({"ip": ip, "name": name}).encode()
+
+
+def parse_announce(data):
+    """Return (ip, name) from a discovery datagram, or None if it is not one."""
+    if data[:4] == ANNOUNCE_MAGIC:
+        if len(data) < ANNOUNCE_FMT.size:
+            return None
+        _, version, packed_ip, name_len = ANNOUNCE_FMT.unpack_from(data)
+        if version != ANNOUNCE_VERSION:
+            return None
+        name = data[ANNOUNCE_FMT.size:ANNOUNCE_FMT.size + name_len].decode(errors="ignore")
+        return socket.inet_ntoa(packed_ip), name
+    # JSON datagrams from FileDrop versions before the binary format
+    try:
+        info = orjson.loads(data) if orjson else json.loads(data.decode())
+        return info["ip"], info["name"]
+    except Exception:
+        return None
+
+
+def _fast_ssh_transport(sock, **kwargs):
+    # Put the hardware-friendly algorithms first; anything else paramiko
+    # supports stays after them so old servers still negotiate.
+    t = paramiko.Transport(sock, **kwargs)
+    opts = t.get_security_options()
+    opts.ciphers = [c for c in SSH_CIPHERS if c in t._preferred_ciphers] + \
+                   [c for c in opts.ciphers if c not in SSH_CIPHERS]
+    opts.digests = [m for m in SSH_MACS if m in t._preferred_macs] + \
+                   [m for m in opts.digests if m not in SSH_MACS]
+    return t
+
+
+def ssh_connect(ip, port, username, password, timeout=10, compress=False):
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    ssh.connect(ip, port=port, username=username, password=password, timeout=timeout,
+                compress=compress, transport_factory=_fast_ssh_transport)
+    # SFTP is many small request/reply packets: no Nagle, and keep idle sessions alive
+    transport = ssh.get_transport()
+    tune_socket(transport.sock, socket.SO_RCVBUF)
+    try:
+        transport.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    except OSError:
+        pass
+    # TCP keepalive probes only start after hours; this keeps NAT state for idle sessions
+    transport.set_keepalive(SSH_KEEPALIVE)
+    return ssh
+
+
+def open_sftp(ssh):
+    # Larger channel window than open_sftp()'s default (2 MiB) keeps more reads in flight
+    return paramiko.SFTPClient.from_transport(ssh.get_transport(), window_size=SFTP_WINDOW)
+
+
 def broadcast_ip(ip):
     if ip.startswith('127.'):
         return '255.255.255.255'
@@ -98,15 +340,68 @@ class AnnouncerThread(QThread):
         super().__init__()
         self.name = name
         self.running = True
+        self._wake = threading.Event()  # cuts the sleep between announcements short on stop()
 
     def run(self):
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.setblocking(False)  # a stalled interface must not hold up the loop
+        # IP changes restart the announcer (UnifiedWidget._apply_ip), so the
+        # datagram is built once; the slow refresh only covers missed changes.
+        ip = None
+        refresh_at = 0.0
         while self.running:
-            ip = get_local_ip()
-            payload = json.dumps({"ip": ip, "name": self.name}).encode()
-            sock.sendto(payload, (broadcast_ip(ip), TCP_PORT))
-            time.sleep(ANNOUNCE_INTERVAL)
+            now = time.monotonic()
+            if now >= refresh_at:
+                refresh_at = now + ANNOUNCE_REFRESH
+                new_ip = get_local_ip()
+                if new_ip != ip:
+                    ip = new_ip
+                    payloads = (pack_announce(ip, self.name), pack_legacy_announce(ip, self.name))
+                    target = (broadcast_ip(ip), TCP_PORT)
+            for payload in payloads:
+                try:
+                    sock.sendto(payload, target)
+                except OSError:
+                    pass  # full send buffer or network down: the next announcement retries
+            self._wake.wait(ANNOUNCE_INTERVAL)
+        sock.close()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        self.wait()
+
+
+class AddressWatcherThread(QThread):
+    """Refresh the cached local IP on netlink address events (Linux, needs pyroute2)."""
+
+    changed = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.running = True
+
+    def run(self):
+        global _cached_ip
+        _cached_ip = _compute_local_ip()
+        try:
+            with pyroute2.IPRoute() as ipr:
+                ipr.bind()
+                while self.running:
+                    # Timeout only so stop() is noticed; no work happens without events
+                    if not select.select([ipr], [], [], 1.0)[0]:
+                        continue
+                    if not any(msg["event"] in ("RTM_NEWADDR", "RTM_DELADDR") for msg in ipr.get()):
+                        continue
+                    ip = _compute_local_ip()
+                    if ip != _cached_ip:
+                        _cached_ip = ip
+                        self.changed.emit(ip)
+        except Exception:
+            pass
+        finally:
+            _cached_ip = None
 
     def stop(self):
         self.running = False
@@ -125,13 +420,25 @@ class ListenerThread(QThread):
     def run(self):
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.bind(("", TCP_PORT))
+        sock.setblocking(False)
+        sel = selectors.DefaultSelector()
+        sel.register(sock, selectors.EVENT_READ)
+        # Wake at least once a second so stop() is honoured without a poke packet
         while self.running:
-            try:
-                data, _ = sock.recvfrom(1024)
-                info = json.loads(data.decode())
-                self.new_peer.emit(info["ip"], info["name"])
-            except Exception:
+            if not sel.select(timeout=1.0):
                 continue
+            while True:  # drain everything that is queued
+                try:
+                    data, _ = sock.recvfrom(4096)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    break  # e.g. ICMP port-unreachable surfacing on Windows
+                peer = parse_announce(data)
+                if peer:
+                    self.new_peer.emit(*peer)
+        sel.close()
+        sock.close()
 
     def stop(self):
         self.running = False
@@ -139,6 +446,17 @@ class ListenerThread(QThread):
 
 # Receiver Thread
 
+class _BodyProgress:
+    """Byte count and progress pacing for one file body being received."""
+
+    def __init__(self, offset, filesize):
+        self.offset = offset
+        self.filesize = filesize
+        self.received = offset
+        self.start = time.perf_counter()
+        self.next_emit = 0.0
+
+
 class ReceiverThread(QThread):
     status = pyqtSignal(str)
     progress = pyqtSignal(int, float)  # percent
@@ -149,166 +467,274 @@ class ReceiverThread(QThread):
         self.save_dir = save_dir
         self._running = True
         self._partials = {}  # (name, size) -> {"part": Path, "final": Path}
+        self._partials_lock = threading.Lock()  # connections are handled concurrently
+        self._pool = None
+        self._conns = set()  # open connections; stop() shuts them down
+        self._conns_lock = threading.Lock()
 
     def run(self):
         srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if SOCKET_BUFFER:
+            # Set before listen() so accepted sockets inherit it and the window scale fits
+            srv.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
         srv.bind(("", TCP_PORT))
-        srv.listen(1)
+        srv.listen(RECEIVE_WORKERS * 2)
+        srv.settimeout(1.0)  # lets the loop notice stop(); accepted sockets stay blocking
         self.status.emit(f"Listening on {TCP_PORT} …")
+        # Each connection gets a worker, so one slow sender does not hold up the rest
+        self._pool = ThreadPoolExecutor(max_workers=RECEIVE_WORKERS, thread_name_prefix="receive")
         while self._running:
-            conn, addr = srv.accept()
-            if not self._running:
-                conn.close()
-                break
-            with conn:
-                self.status.emit(f"Connected: {addr[0]}")
-                # ---- header ----
-                header = conn.recv(4)
-                if len(header) < 4:
-                    continue
-                # Note handling
-                if header == NOTE_HEADER:
-                    length_bytes = conn.recv(4)
-                    if len(length_bytes) < 4:
-                        continue
-                    note_len = struct.unpack("!I", length_bytes)[0]
-                    note_data = b''
-                    while len(note_data) < note_len:
-                        chunk = conn.recv(min(BUFFER_SIZE, note_len - len(note_data)))
-                        if not chunk:
-                            break
-                        note_data += chunk
+            try:
+                conn, addr = srv.accept()
+            except socket.timeout:
+                continue
+            set_recv_timeout(conn, RECEIVE_TIMEOUT)
+            with self._conns_lock:
+                self._conns.add(conn)
+            if not self._running:  # stop() already swept the open connections
+                self._drop_conn(conn)
+            self._pool.submit(self._handle_conn, conn, addr)
+        srv.close()
+        self._pool.shutdown(wait=False)
+
+    def _handle_conn(self, conn, addr):
+        try:
+            self._serve_conn(conn, addr)
+        finally:
+            with self._conns_lock:
+                self._conns.discard(conn)
+            conn.close()
+
+    @staticmethod
+    def _drop_conn(conn):
+        # Wakes a worker blocked in recv()/splice() on this connection
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _serve_conn(self, conn, addr):
+        tune_socket(conn, socket.SO_RCVBUF)
+        self.status.emit(f"Connected: {addr[0]}")
+        # ---- header ----
+        header = recv_exact(conn, 4)
+        if len(header) < 4:
+            return
+        verify = header == CHECKSUM_HEADER
+        if verify:
+            header = recv_exact(conn, 4)
+            if len(header) < 4:
+                return
+        # Note handling
+        if header == NOTE_HEADER:
+            length_bytes = recv_exact(conn, 4)
+            if len(length_bytes) < 4:
+                return
+            note_data = recv_exact(conn, _U32.unpack(length_bytes)[0])
+            try:
+                text = note_data.decode()
+            except UnicodeDecodeError:
+                text = ''
+            self.new_note.emit(text)
+            self.status.emit("Received note ✓")
+            return
+        if header == RESUME_HEADER:
+            name_len_bytes = recv_exact(conn, 4)
+            if len(name_len_bytes) < 4:
+                return
+            filename = recv_exact(conn, _U32.unpack(name_len_bytes)[0]).decode()
+            size_bytes = recv_exact(conn, 8)
+            if len(size_bytes) < 8:
+                return
+            filesize = _U64.unpack(size_bytes)[0]
+            key = (filename, filesize)
+            with self._partials_lock:
+                info = self._partials.get(key)
+            if info and info["part"].exists():
+                part_path = info["part"]
+                final_path = info["final"]
+            else:
+                # Try to resume from existing .part file (after restart)
+                final_path = Path(self.save_dir) / Path(filename).name
+                part_path = final_path.with_suffix(final_path.suffix + ".part")
+                if part_path.exists():
+                    with self._partials_lock:
+                        self._partials[key] = {"part": part_path, "final": final_path}
+                else:
+                    part_path = None
+                # If complete file exists, signal completion
+                if final_path.exists() and final_path.stat().st_size == filesize:
+                    conn.sendall(_U64.pack(filesize))
+                    self.status.emit(f"Already complete: {final_path.name}")
+                    return
+                if part_path is None:
+                    # Otherwise start a new partial
+                    final_path, part_path, fd = create_unique_part(final_path.parent, final_path.name)
+                    os.close(fd)
+                    with self._partials_lock:
+                        self._partials[key] = {"part": part_path, "final": final_path}
+            offset = part_path.stat().st_size if part_path.exists() else 0
+            conn.sendall(_U64.pack(offset))
+            # r+b rather than ab: splice(2) refuses O_APPEND targets
+            mode = "r+b" if offset else "wb"
+            with open(part_path, mode) as f:
+                received = self._receive_body(conn, f, offset, filesize)
+            if received >= filesize:
+                self._complete(conn, key, part_path, final_path, verify)
+            else:
+                self.status.emit(f"Transfer paused: {Path(filename).name} (resume available)")
+            return
+        if header == CANCEL_HEADER:
+            name_len_bytes = recv_exact(conn, 4)
+            if len(name_len_bytes) < 4:
+                return
+            filename = recv_exact(conn, _U32.unpack(name_len_bytes)[0]).decode()
+            # Delete matching partials
+            with self._partials_lock:
+                dropped = [self._partials.pop(k) for k in [k for k in self._partials if k[0] == filename]]
+            for info in dropped:
+                if info["part"].exists():
                     try:
-                        text = note_data.decode()
-                    except UnicodeDecodeError:
-                        text = ''
-                    self.new_note.emit(text)
-                    self.status.emit("Received note ✓")
-                    continue  # wait for next connection/message
-                if header == RESUME_HEADER:
-                    name_len = struct.unpack("!I", conn.recv(4))[0]
-                    filename = conn.recv(name_len).decode()
-                    size_bytes = conn.recv(8)
-                    filesize = struct.unpack("!Q", size_bytes)[0]
-                    key = (filename, filesize)
-                    info = self._partials.get(key)
-                    if info and info["part"].exists():
-                        part_path = info["part"]
-                        final_path = info["final"]
-                    else:
-                        # Try to resume from existing .part file (after restart)
-                        final_path = Path(self.save_dir) / Path(filename).name
-                        part_path = final_path.with_suffix(final_path.suffix + ".part")
-                        if part_path.exists():
-                            self._partials[key] = {"part": part_path, "final": final_path}
-                        else:
-                            part_path = None
-                        # If complete file exists, signal completion
-                        if final_path.exists() and final_path.stat().st_size == filesize:
-                            conn.sendall(struct.pack("!Q", filesize))
-                            self.status.emit(f"Already complete: {final_path.name}")
-                            continue
-                        if part_path is None:
-                            # Otherwise start a new partial
-                            base = final_path.stem
-                            ext = final_path.suffix
-                            parent = final_path.parent
-                            counter = 1
-                            while final_path.exists() or (parent / f"{base} ({counter}){ext}").exists():
-                                final_path = parent / f"{base} ({counter}){ext}"
-                                counter += 1
-                            part_path = final_path.with_suffix(final_path.suffix + ".part")
-                            self._partials[key] = {"part": part_path, "final": final_path}
-                    offset = part_path.stat().st_size if part_path.exists() else 0
-                    conn.sendall(struct.pack("!Q", offset))
-                    received = offset
-                    start = time.perf_counter()
-                    mode = "ab" if offset else "wb"
-                    with open(part_path, mode) as f:
-                        while received < filesize:
-                            chunk = conn.recv(min(BUFFER_SIZE, filesize - received))
-                            if not chunk:
-                                break
-                            f.write(chunk)
-                            received += len(chunk)
-                            elapsed = max(time.perf_counter() - start, 1e-3)
-                            speed = ((received - offset) / (1024 ** 2)) / elapsed
-                            percent = int(received / filesize * 100)
-                            self.progress.emit(percent, speed)
-                    if received >= filesize:
-                        part_path.replace(final_path)
-                        self._partials.pop(key, None)
-                        self.status.emit(f"Saved {final_path.name} ✓")
-                    else:
-                        self.status.emit(f"Transfer paused: {Path(filename).name} (resume available)")
-                    continue
-                if header == CANCEL_HEADER:
-                    name_len = struct.unpack("!I", conn.recv(4))[0]
-                    filename = conn.recv(name_len).decode()
-                    # Delete matching partials
-                    to_delete = [k for k in self._partials.keys() if k[0] == filename]
-                    for key in to_delete:
-                        info = self._partials.pop(key, None)
-                        if info and info["part"].exists():
-                            try:
-                                info["part"].unlink()
-                            except Exception:
-                                pass
-                    # Also delete exact .part file if present
-                    part_path = (Path(self.save_dir) / Path(filename).name).with_suffix(Path(filename).suffix + ".part")
-                    if part_path.exists():
-                        try:
-                            part_path.unlink()
-                        except Exception:
-                            pass
-                    self.status.emit(f"Discarded partial for {Path(filename).name}")
-                    continue
-                # File transfer handling (new)
-                name_len = struct.unpack("!I", header)[0]
-                filename = conn.recv(name_len).decode()
-                size_bytes = conn.recv(8)
-                filesize = struct.unpack("!Q", size_bytes)[0]
-                dest = Path(self.save_dir) / Path(filename).name
-
-                # Ensure unique filename (do not overwrite)
-                base = dest.stem
-                ext = dest.suffix
-                parent = dest.parent
-                counter = 1
-                while dest.exists():
-                    dest = parent / f"{base} ({counter}){ext}"
-                    counter += 1
-                part_dest = dest.with_suffix(dest.suffix + ".part")
-                key = (filename, filesize)
-                self._partials[key] = {"part": part_dest, "final": dest}
-
-                start = time.perf_counter()
-                received = 0
-                with open(part_dest, "wb") as f:
-                    while received < filesize:
-                        chunk = conn.recv(min(BUFFER_SIZE, filesize - received))
-                        if not chunk:
-                            break
-                        f.write(chunk)
-                        received += len(chunk)
-                        elapsed = max(time.perf_counter() - start, 1e-3)
-                        speed = (received / (1024 ** 2)) / elapsed
-                        percent = int(received / filesize * 100)
-                        self.progress.emit(percent, speed)
-                if received >= filesize:
-                    part_dest.replace(dest)
+                        info["part"].unlink()
+                    except Exception:
+                        pass
+            # Also delete exact .part file if present
+            part_path = (Path(self.save_dir) / Path(filename).name).with_suffix(Path(filename).suffix + ".part")
+            if part_path.exists():
+                try:
+                    part_path.unlink()
+                except Exception:
+                    pass
+            self.status.emit(f"Discarded partial for {Path(filename).name}")
+            return
+        # File transfer handling (new)
+        name_len = _U32.unpack(header)[0]
+        filename = recv_exact(conn, name_len).decode()
+        size_bytes = recv_exact(conn, 8)
+        if len(size_bytes) < 8:
+            return
+        filesize = _U64.unpack(size_bytes)[0]
+        # Ensure unique filename (do not overwrite)
+        dest, part_dest, fd = create_unique_part(self.save_dir, Path(filename).name)
+        key = (filename, filesize)
+        with self._partials_lock:
+            self._partials[key] = {"part": part_dest, "final": dest}
+
+        with os.fdopen(fd, "wb") as f:
+            received = self._receive_body(conn, f, 0, filesize)
+        if received >= filesize:
+            self._complete(conn, key, part_dest, dest, verify)
+        else:
+            self.status.emit(f"Transfer paused: {dest.name} (resume available)")
+
+    def _complete(self, conn, key, part_path, final_path, verify):
+        # Move a fully received partial into place, checking the CRC32C trailer if one was sent
+        if verify:
+            trailer = recv_exact(conn, 4)
+            if len(trailer) < 4:
+                # The body is all here but the connection dropped before the checksum: keep it for a resume
+                self.status.emit(f"Transfer paused: {final_path.name} (resume available)")
+                return
+            if crc32c is not None and _U32.unpack(trailer)[0] != file_crc32c(part_path):
+                with self._partials_lock:
                     self._partials.pop(key, None)
-                    self.status.emit(f"Saved {dest.name} ✓")
-                else:
-                    self.status.emit(f"Transfer paused: {dest.name} (resume available)")
+                try:
+                    part_path.unlink()
+                except Exception:
+                    pass
+                self.status.emit(f"⚠ Checksum mismatch: {final_path.name} (discarded)")
+                return
+        part_path.replace(final_path)
+        with self._partials_lock:
+            self._partials.pop(key, None)
+        if verify and crc32c is None:
+            # The sender asked for a check we cannot run; don't claim it passed
+            self.status.emit(f"Saved {final_path.name} (not verified: crc32c missing)")
+        else:
+            self.status.emit(f"Saved {final_path.name} ✓")
+
+    def _receive_body(self, conn, f, offset, filesize):
+        """Copy the file body from conn into f at offset (positional writes). Returns bytes received."""
+        xfer = _BodyProgress(offset, filesize)
+        fd = f.fileno()
+        preallocate(fd, filesize)
+        try:
+            if hasattr(os, "splice") and self._splice_body(conn, fd, xfer):
+                return xfer.received
+            # A writer thread drains the buffers so disk latency overlaps the next recv()
+            sink = _PositionalWriter(fd, xfer.received)
+            try:
+                with _QueuedWriter(sink) as writer:
+                    while xfer.received < filesize:
+                        buf = writer.free_buffer(BUFFER_SIZE)
+                        n = conn.recv_into(buf, min(BUFFER_SIZE, filesize - xfer.received))
+                        if not n:
+                            break
+                        writer.write(memoryview(buf)[:n])
+                        xfer.received += n
+                        self._report(xfer)
+            except OSError:
+                xfer.received = sink.pos  # only what reached the file counts for resume
+                raise
+            return xfer.received
+        finally:
+            if xfer.received < filesize:
+                # The reservation never moved st_size; this only hands unused blocks back
+                os.ftruncate(fd, xfer.received)
+
+    def _splice_body(self, conn, fd, xfer):
+        # Linux: socket -> pipe -> file without copying through user space.
+        # Advances xfer.received; returns False if the caller should carry on with recv().
+        rfd, wfd = os.pipe()
+        try:
+            try:
+                fcntl.fcntl(wfd, fcntl.F_SETPIPE_SZ, BUFFER_SIZE)
+            except (AttributeError, OSError):
+                pass
+            while xfer.received < xfer.filesize:
+                try:
+                    n = os.splice(conn.fileno(), wfd, min(BUFFER_SIZE, xfer.filesize - xfer.received))
+                except BlockingIOError:
+                    return True  # RECEIVE_TIMEOUT hit: the sender stalled, keep what arrived for resume
+                except OSError:
+                    return xfer.received > xfer.offset
+                if not n:
+                    break
+                try:
+                    while n:
+                        moved = os.splice(rfd, fd, n, offset_dst=xfer.received)
+                        xfer.received += moved
+                        n -= moved
+                except OSError:
+                    # Target refuses splice: flush what is left in the pipe and fall back
+                    while n:
+                        data = os.read(rfd, n)
+                        write_at(fd, data, xfer.received)
+                        xfer.received += len(data)
+                        n -= len(data)
+                    return False
+                self._report(xfer)
+        finally:
+            os.close(rfd)
+            os.close(wfd)
+        return True
+
+    def _report(self, xfer):
+        # At most one signal per PROGRESS_INTERVAL; the final update always goes out
+        now = time.perf_counter()
+        if now < xfer.next_emit and xfer.received < xfer.filesize:
+            return
+        xfer.next_emit = now + PROGRESS_INTERVAL
+        speed = ((xfer.received - xfer.offset) / (1024 ** 2)) / max(now - xfer.start, 1e-3)
+        self.progress.emit(xfer.received * 100 // xfer.filesize, speed)
 
     def stop(self):
         self._running = False
-        try:
-            socket.create_connection(("127.0.0.1", TCP_PORT), timeout=1).close()
-        except Exception:
-            pass
+        with self._conns_lock:
+            conns = list(self._conns)
+        for conn in conns:
+            self._drop_conn(conn)
         self.wait()
 
 
@@ -336,59 +762,322 @@ class SenderThread(QThread):
                 sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
             except Exception:
                 pass
-            sent = 0
+            tune_socket(sock, socket.SO_SNDBUF)
+            verify = VERIFY_CRC and crc32c is not None
+            prefix = CHECKSUM_HEADER if verify else b""
+            name_bytes = fname.encode()
             if self.resume:
-                sock.sendall(RESUME_HEADER)
-                sock.sendall(struct.pack("!I", len(fname)))
-                sock.sendall(fname.encode())
-                sock.sendall(struct.pack("!Q", filesize))
-                offset_bytes = sock.recv(8)
+                sock.sendall(prefix + RESUME_HEADER + _U32.pack(len(name_bytes)) + name_bytes + _U64.pack(filesize))
+                offset_bytes = recv_exact(sock, 8)
                 if len(offset_bytes) < 8:
                     raise RuntimeError("Resume failed (no offset)")
-                offset = struct.unpack("!Q", offset_bytes)[0]
+                offset = _U64.unpack(offset_bytes)[0]
                 if offset >= filesize:
+                    if verify:
+                        # A complete .part on the other side still waits for the checksum
+                        try:
+                            sock.sendall(_U32.pack(file_crc32c(self.path)))
+                        except OSError:
+                            pass  # it already had the finished file and hung up
                     self.status.emit(f"Already complete: {fname}")
                     return
-                sent = offset
                 with open(self.path, "rb") as f:
-                    f.seek(offset)
-                    start = time.perf_counter()
-                    while True:
-                        chunk = f.read(BUFFER_SIZE)
-                        if not chunk:
-                            break
-                        sock.sendall(chunk)
-                        sent += len(chunk)
-                        elapsed = max(time.perf_counter() - start, 1e-3)
-                        speed = ((sent - offset) / (1024 ** 2)) / elapsed
-                        percent = int(sent / filesize * 100) if filesize else 0
-                        self.progress.emit(percent, speed)
+                    sent = self._send_body(sock, f, offset, filesize)
+                if verify and sent >= filesize:
+                    sock.sendall(_U32.pack(file_crc32c(self.path)))
                 sock.close()
                 self.status.emit(f"Resumed {fname} ✓")
                 self.progress.emit(100, 0.0)
                 return
 
-            sock.sendall(struct.pack("!I", len(fname)))
-            sock.sendall(fname.encode())
-            sock.sendall(struct.pack("!Q", filesize))
-            start = time.perf_counter()
+            sock.sendall(prefix + _U32.pack(len(name_bytes)) + name_bytes + _U64.pack(filesize))
             with open(self.path, "rb") as f:
-                while True:
-                    chunk = f.read(BUFFER_SIZE)
-                    if not chunk:
-                        break
-                    sock.sendall(chunk)
-                    sent += len(chunk)
-                    elapsed = max(time.perf_counter() - start, 1e-3)
-                    speed = (sent / (1024 ** 2)) / elapsed
-                    percent = int(sent / filesize * 100) if filesize else 0
-                    self.progress.emit(percent, speed)
+                sent = self._send_body(sock, f, 0, filesize)
+            if verify and sent >= filesize:
+                sock.sendall(_U32.pack(file_crc32c(self.path)))
             sock.close()
             self.status.emit(f"Sent {fname} ✓")
             self.progress.emit(100, 0.0)
         except Exception as e:
             self.status.emit(f"⚠ {e}")
 
+    def _send_body(self, sock, f, offset, filesize):
+        """Stream f from offset to the socket, in-kernel via sendfile(2) where possible."""
+        sent = offset
+        start = time.perf_counter()
+        next_emit = start
+        use_sendfile = hasattr(os, "sendfile")
+        mm = view = None
+        try:
+            while sent < filesize:
+                if use_sendfile:
+                    try:
+                        n = os.sendfile(sock.fileno(), f.fileno(), sent, min(SENDFILE_CHUNK, filesize - sent))
+                    except OSError:
+                        if sent > offset:
+                            raise
+                        # e.g. a filesystem without sendfile support
+                        use_sendfile = False
+                        continue
+                else:
+                    if view is None:
+                        # Send slices of a read-only mapping: no read() copy, no bytes per chunk
+                        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                        if hasattr(mmap, "MADV_SEQUENTIAL"):
+                            mm.madvise(mmap.MADV_SEQUENTIAL)
+                        view = memoryview(mm)
+                    with view[sent:sent + BUFFER_SIZE] as chunk:
+                        sock.sendall(chunk)
+                        n = len(chunk)
+                if not n:
+                    break
+                sent += n
+                now = time.perf_counter()
+                if now >= next_emit:
+                    next_emit = now + PROGRESS_INTERVAL
+                    speed = ((sent - offset) / (1024 ** 2)) / max(now - start, 1e-3)
+                    self.progress.emit(sent * 100 // filesize, speed)
+        finally:
+            if view is not None:
+                view.release()
+                mm.close()
+        return sent
+
+# Background tasks
+
+class _TaskSignals(QObject):
+    done = pyqtSignal(object, object)  # result, exception
+
+
+class BackgroundTask(QRunnable):
+    """Run fn(*args) off the GUI thread; signals.done delivers (result, error)."""
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.signals = _TaskSignals()
+
+    def run(self):
+        try:
+            result, error = self.fn(*self.args), None
+        except Exception as e:
+            result, error = None, e
+        self.signals.done.emit(result, error)
+
+
+def submit_task(pool, pending, on_done, fn, *args):
+    """Run fn(*args) on pool and call on_done(result, error) on the GUI thread.
+
+    pending is the caller's set of tasks in flight; it keeps each task's
+    signals object alive until the result has been delivered.
+    """
+    task = BackgroundTask(fn, *args)
+    task.setAutoDelete(False)
+    pending.add(task)
+
+    def deliver(result, error):
+        pending.discard(task)
+        on_done(result, error)
+    task.signals.done.connect(deliver)
+    pool.start(task)
+
+
+class _PositionalWriter:
+    """File-like sink that writes consecutive chunks to fd from pos on."""
+
+    def __init__(self, fd, pos):
+        self.fd = fd
+        self.pos = pos
+
+    def write(self, data):
+        write_at(self.fd, data, self.pos)
+        self.pos += len(data)
+        return len(data)
+
+
+class _QueuedWriter:
+    """Hand writes to a background thread through a bounded queue so disk writes overlap network reads."""
+
+    def __init__(self, f, depth=8):
+        self.f = f
+        self._queue = queue.Queue(maxsize=depth)  # caps buffered data at depth chunks
+        self._error = None
+        self._free = None  # buffer pool, created by the first free_buffer() call
+        self._thread = threading.Thread(target=self._drain, daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            if self._error is None:
+                try:
+                    self.f.write(data)
+                except Exception as e:
+                    self._error = e
+            if self._free is not None and isinstance(data, memoryview):
+                self._free.put(data.obj)
+
+    def free_buffer(self, length):
+        """Return a preallocated buffer; writing a memoryview of it hands it back once on disk."""
+        if self._free is None:
+            self._free = queue.Queue()
+            for _ in range(self._queue.maxsize + 2):  # queued + being written + being filled
+                self._free.put(bytearray(length))
+        return self._free.get()
+
+    def write(self, data):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(data)
+        return len(data)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            try:
+                self.close()
+            except Exception:
+                pass  # keep the original error
+
+
+# SFTP download worker
+
+class SCPDownloadThread(QThread):
+    """Download one remote file over several SFTP sessions sharing the SSH transport.
+
+    Each session pulls its own byte range with readv() (pipelined requests) and
+    writes it into a preallocated local file, so per-channel window/RTT limits overlap.
+    """
+    progress = pyqtSignal(int, float)
+    done = pyqtSignal(bool, str)
+
+    def __init__(self, ssh, remote_path: str, local_path: str, remote_size: int):
+        super().__init__()
+        self.ssh = ssh
+        self.remote_path = remote_path
+        self.local_path = local_path
+        self.remote_size = remote_size
+        self.running = True
+        self._received = 0
+        self._lock = threading.Lock()
+        self._errors = []
+        self._sftps = []  # open sessions, closed by stop() to break blocked reads
+        self._fd = None
+        self._fd_users = 0  # run() plus live fetch threads; the last one out closes the file
+        self._discard = False
+
+    def run(self):
+        size = self.remote_size
+        fd = os.open(self.local_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        self._fd = fd
+        self._fd_users = 1
+        try:
+            if size:
+                if hasattr(os, "posix_fallocate"):
+                    try:
+                        os.posix_fallocate(fd, 0, size)
+                    except OSError:
+                        os.ftruncate(fd, size)
+                else:
+                    os.ftruncate(fd, size)
+            channels = SCP_CHANNELS if size >= SCP_SPLIT_MIN else 1
+            span = -(-size // channels) if size else 0
+            workers = []
+            for i in range(channels):
+                start = i * span
+                length = min(span, size - start)
+                if length <= 0 and i:
+                    break
+                with self._lock:
+                    self._fd_users += 1
+                t = threading.Thread(target=self._fetch_range, args=(fd, start, length), daemon=True)
+                t.start()
+                workers.append(t)
+            t0 = time.perf_counter()
+            # After stop() the fetch threads are left to unwind on their own
+            while self.running and any(t.is_alive() for t in workers):
+                for t in workers:
+                    t.join(0.1)
+                received = self._received
+                speed = (received / (1024 ** 2)) / max(time.perf_counter() - t0, 1e-3)
+                self.progress.emit(received * 100 // size if size else 0, speed)
+        finally:
+            self._discard = bool(self._errors) or not self.running
+            self._release_fd()
+        if self._discard:
+            self.done.emit(False, str(self._errors[0]) if self._errors and self.running else "Cancelled")
+            return
+        self.progress.emit(100, 0.0)
+        self.done.emit(True, self.local_path)
+
+    def _fetch_range(self, fd, start, length):
+        sftp = None
+        try:
+            sftp = open_sftp(self.ssh)
+            with self._lock:
+                self._sftps.append(sftp)
+                if not self.running:  # stop() came while the session was opening
+                    return
+            with sftp.open(self.remote_path, "rb") as rf:
+                blocks = [(off, min(SCP_READ_CHUNK, start + length - off))
+                          for off in range(start, start + length, SCP_READ_CHUNK)]
+                off = start
+                for data in rf.readv(blocks):
+                    if not self.running or self._errors:
+                        return
+                    if hasattr(os, "pwrite"):
+                        os.pwrite(fd, data, off)
+                    else:
+                        with self._lock:  # no pwrite on Windows
+                            os.lseek(fd, off, os.SEEK_SET)
+                            os.write(fd, data)
+                    off += len(data)
+                    with self._lock:
+                        self._received += len(data)
+        except Exception as e:
+            self._errors.append(e)
+        finally:
+            if sftp:
+                sftp.close()
+            self._release_fd()
+
+    def _release_fd(self):
+        # Closing the file under a write still in flight could hit a reused fd number
+        with self._lock:
+            self._fd_users -= 1
+            if self._fd_users:
+                return
+        os.close(self._fd)
+        if self._discard:
+            try:
+                os.unlink(self.local_path)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.running = False
+        with self._lock:
+            sftps = list(self._sftps)
+        for sftp in sftps:
+            try:
+                sftp.close()  # fails the readv() it is blocked in
+            except Exception:
+                pass
+        self.wait()
+
 # Drag‑and‑drop label
 
 class DragLabel(QLabel):
@@ -416,8 +1105,14 @@ class DragLabel(QLabel):
             e.acceptProposedAction()
 
     def dropEvent(self, e):
-        for url in e.mimeData().urls():
-            self.file_dropped.emit(url.toLocalFile())
+        # Skip web links and folders here rather than failing in _send_file
+        paths = [p for p in (url.toLocalFile() for url in e.mimeData().urls() if url.isLocalFile())
+                 if os.path.isfile(p)]
+        if not paths:
+            e.ignore()
+            return
+        for path in paths:
+            self.file_dropped.emit(path)
         e.acceptProposedAction()
 
     def mousePressEvent(self, event):
@@ -429,6 +1124,8 @@ class DragLabel(QLabel):
 # Add SCPDialog class
 
 class SCPDialog(QDialog):
+    _pool = None  # one worker thread shared by all dialogs: SFTP calls run in submission order
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("SCP Download")
@@ -436,6 +1133,12 @@ class SCPDialog(QDialog):
         self.ssh = None
         self.current_path = '.'
         self.connected = False
+        self._downloads = {}  # running SCPDownloadThread -> (percent, speed)
+        self._queue = []  # (remote_path, local_path, size or None) waiting for a slot
+        self._pending = 0  # queued for stat, not yet running
+        self._batch = []  # results of the current batch: (ok, msg)
+        self._tasks = set()
+        self._list_gen = 0
         self.resize(520, 420)
         self.layout = QVBoxLayout(self)
         form = QFormLayout()
@@ -471,9 +1174,10 @@ class SCPDialog(QDialog):
         nav_row.addWidget(self.up_btn); nav_row.addWidget(self.path_lbl); nav_row.addStretch(1)
         self.browser_layout.addLayout(nav_row)
         self.file_list = QListWidget()
+        self.file_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.file_list.itemDoubleClicked.connect(self._item_activated)
         self.browser_layout.addWidget(self.file_list)
-        self.download_btn = QPushButton("Download Selected File")
+        self.download_btn = QPushButton("Download Selected")
         self.download_btn.clicked.connect(self._download_file)
         self.browser_layout.addWidget(self.download_btn)
         self.browser_widget.setVisible(False)
@@ -488,10 +1192,13 @@ class SCPDialog(QDialog):
         folder = QFileDialog.getExistingDirectory(self, "Choose local folder", self.local_edit.text())
         if folder:
             self.local_edit.setText(folder)
+    def _submit(self, on_done, fn, *args):
+        if SCPDialog._pool is None:
+            SCPDialog._pool = QThreadPool()
+            SCPDialog._pool.setMaxThreadCount(1)
+        submit_task(SCPDialog._pool, self._tasks, on_done, fn, *args)
     def _connect(self):
-        try:
-            import paramiko
-        except ImportError:
+        if paramiko is None:
             self.status_lbl.setText("Please install paramiko: pip install paramiko")
             return
         ip = self.ip_edit.text().strip()
@@ -499,13 +1206,19 @@ class SCPDialog(QDialog):
         username = self.user_edit.text().strip()
         password = self.pass_edit.text()
         self.status_lbl.setText("Connecting…")
-        QApplication.setOverrideCursor(Qt.WaitCursor)
-        try:
-            self.ssh = paramiko.SSHClient()
-            self.ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            self.ssh.connect(ip, port=port, username=username, password=password, timeout=10)
-            self.sftp = self.ssh.open_sftp()
-            self.current_path = self.sftp.normalize('.')
+        self.connect_btn.setEnabled(False)
+
+        def open_session():
+            ssh = ssh_connect(ip, port, username, password, compress=COMPRESS)
+            sftp = open_sftp(ssh)
+            return ssh, sftp, sftp.normalize('.')
+
+        def connected(result, error):
+            self.connect_btn.setEnabled(True)
+            if error is not None:
+                self.status_lbl.setText(f"Connection failed: {error}")
+                return
+            self.ssh, self.sftp, self.current_path = result
             self.connected = True
             self._show_browser()
             self.status_lbl.setText("Connected. Browse and select a file to download.")
@@ -516,31 +1229,38 @@ class SCPDialog(QDialog):
                 "password": password,
                 "local_dir": self.local_edit.text().strip(),
             })
-        except Exception as e:
-            self.status_lbl.setText(f"Connection failed: {e}")
-        QApplication.restoreOverrideCursor()
+        self._submit(connected, open_session)
     def _show_browser(self):
         self.connect_btn.setVisible(False)
         self.browser_widget.setVisible(True)
         self._list_dir()
     def _list_dir(self):
-        self.file_list.clear()
         self.path_lbl.setText(self.current_path)
+        self._list_gen += 1
+        gen = self._list_gen
+
+        def listed(entries, error):
+            if gen != self._list_gen:
+                return  # user navigated on before this listing came back
+            self._fill_list(entries, error)
+        self._submit(listed, self.sftp.listdir_attr, self.current_path)
+    def _fill_list(self, entries, error):
+        self.file_list.clear()
+        if error is not None:
+            self.status_lbl.setText(f"Failed to list directory: {error}")
+            return
+        # Folders first, then files; one repaint for the whole listing
+        self.file_list.setUpdatesEnabled(False)
         try:
-            entries = self.sftp.listdir_attr(self.current_path)
-            # Folders first, then files
-            folders = [e for e in entries if stat.S_ISDIR(e.st_mode)]
-            files = [e for e in entries if not stat.S_ISDIR(e.st_mode)]
-            for f in sorted(folders, key=lambda x: x.filename):
-                item = QListWidgetItem(f"📁 {f.filename}")
-                item.setData(Qt.UserRole, (f.filename, True))
-                self.file_list.addItem(item)
-            for f in sorted(files, key=lambda x: x.filename):
-                item = QListWidgetItem(f"{f.filename}")
-                item.setData(Qt.UserRole, (f.filename, False))
+            for f, is_dir in sorted(((e, stat.S_ISDIR(e.st_mode)) for e in entries),
+                                    key=lambda x: (not x[1], x[0].filename)):
+                item = QListWidgetItem(f"📁 {f.filename}" if is_dir else f.filename)
+                item.setData(Qt.UserRole, (f.filename, is_dir))
+                if not is_dir:
+                    item.setData(Qt.UserRole + 1, f.st_size)  # saves a stat() round trip at download time
                 self.file_list.addItem(item)
-        except Exception as e:
-            self.status_lbl.setText(f"Failed to list directory: {e}")
+        finally:
+            self.file_list.setUpdatesEnabled(True)
     def _item_activated(self, item):
         name, is_dir = item.data(Qt.UserRole)
         if is_dir:
@@ -551,41 +1271,85 @@ class SCPDialog(QDialog):
             self._list_dir()
         else:
             self.selected_file = self.current_path + ('/' if not self.current_path.endswith('/') else '') + name
-            for i in range(self.file_list.count()):
-                self.file_list.item(i).setSelected(False)
-            item.setSelected(True)
+            self.file_list.setCurrentItem(item, QItemSelectionModel.ClearAndSelect)
     def _go_up(self):
         if self.current_path == '/' or self.current_path == '':
             return
-        self.current_path = str(Path(self.current_path).parent)
+        self.current_path = str(PurePosixPath(self.current_path).parent)
         if not self.current_path:
             self.current_path = '/'
         self._list_dir()
     def _download_file(self):
-        if not self.selected_file:
+        base = self.current_path + ('' if self.current_path.endswith('/') else '/')
+        remote_files = []  # (path, size or None)
+        for item in self.file_list.selectedItems():
+            name, is_dir = item.data(Qt.UserRole)
+            if not is_dir:
+                remote_files.append((base + name, item.data(Qt.UserRole + 1)))
+        if not remote_files and self.selected_file:
+            remote_files = [(self.selected_file, None)]
+        if not remote_files:
             self.status_lbl.setText("Select a file to download.")
             return
-        local_dir = self.local_edit.text().strip()
-        local_path = os.path.join(local_dir, os.path.basename(self.selected_file))
+        local_dir = Path(self.local_edit.text().strip())
+        self._queue.extend((p, str(local_dir / PurePosixPath(p).name), size) for p, size in remote_files)
         self.status_lbl.setText("Downloading…")
-        try:
-            remote_size = self.sftp.stat(self.selected_file).st_size
-            with self.sftp.open(self.selected_file, 'rb') as remote_f, open(local_path, 'wb') as local_f:
-                transferred = 0
-                while True:
-                    chunk = remote_f.read(64*1024)
-                    if not chunk:
-                        break
-                    local_f.write(chunk)
-                    transferred += len(chunk)
-            self.status_lbl.setText(f"Downloaded to {local_path}")
-            # Do not close dialog; allow user to keep browsing/downloading
-        except Exception as e:
-            self.status_lbl.setText(f"Download failed: {e}")
-    def get_params(self):
-        # Not used in browser mode, but kept for compatibility
-        return {}
+        self._pump_downloads()
+    def _pump_downloads(self):
+        # Several files share the one SSH transport, each over its own SFTP sessions
+        while self._queue and len(self._downloads) + self._pending < SCP_PARALLEL_FILES:
+            remote_path, local_path, size = self._queue.pop(0)
+            if size is not None:
+                self._start_download(remote_path, local_path, size)
+                continue
+            self._pending += 1
+
+            def stat_done(st, error, remote_path=remote_path, local_path=local_path):
+                self._pending -= 1
+                if error is not None:
+                    self._download_done(None, False, str(error))
+                    return
+                self._start_download(remote_path, local_path, st.st_size)
+            self._submit(stat_done, self.sftp.stat, remote_path)
+    def _start_download(self, remote_path, local_path, size):
+        t = SCPDownloadThread(self.ssh, remote_path, local_path, size)
+        self._downloads[t] = (0, 0.0)
+        t.progress.connect(lambda percent, speed, t=t: self._download_progress(t, percent, speed))
+        t.done.connect(lambda ok, msg, t=t: self._download_done(t, ok, msg))
+        t.start()
+    def _download_progress(self, thread, percent, speed):
+        if thread not in self._downloads:
+            return
+        self._downloads[thread] = (percent, speed)
+        running = len(self._downloads)
+        avg = sum(p for p, _ in self._downloads.values()) // running
+        total_speed = sum(s for _, s in self._downloads.values())
+        files = f"{running} files, " if running > 1 else ""
+        self.status_lbl.setText(f"Downloading… {files}{avg}%  ({total_speed:.1f} MB/s)")
+    def _download_done(self, thread, ok, msg):
+        self._downloads.pop(thread, None)
+        self._batch.append((ok, msg))
+        self._pump_downloads()
+        if self._downloads or self._pending or self._queue:
+            return
+        batch, self._batch = self._batch, []
+        # Do not close dialog; allow user to keep browsing/downloading
+        if len(batch) == 1:
+            ok, msg = batch[0]
+            self.status_lbl.setText(f"Downloaded to {msg}" if ok else f"Download failed: {msg}")
+            return
+        failed = [msg for ok, msg in batch if not ok]
+        text = f"Downloaded {len(batch) - len(failed)} of {len(batch)} files to {self.local_edit.text().strip()}"
+        self.status_lbl.setText(text + (f" ({failed[0]})" if failed else ""))
+    def _stop_downloads(self):
+        self._queue.clear()
+        for t in list(self._downloads):
+            t.stop()
+    def reject(self):
+        self._stop_downloads()
+        super().reject()
     def closeEvent(self, event):
+        self._stop_downloads()
         try:
             if self.sftp:
                 self.sftp.close()
@@ -605,11 +1369,67 @@ class SCPDialog(QDialog):
 
 # Unified Main Widget (Send + Receive)
 
+# Every button in the widget picks its look by object name; parsed once for the whole widget
+BUTTON_STYLE = """
+QPushButton#primary, QPushButton#primarySmall {
+    background: #1976D2;
+    color: white;
+    border: none;
+    border-radius: 8px;
+}
+QPushButton#primary:hover, QPushButton#primarySmall:hover {
+    background: #1565C0;
+}
+QPushButton#primary {
+    padding: 12px 30px;
+    min-height: 40px;
+    font-size: 16px;
+    font-weight: 500;
+    margin-top: 10px;
+}
+QPushButton#primarySmall {
+    padding: 10px 24px;
+    font-size: 14px;
+}
+QPushButton#secondarySmall {
+    background: #E3F2FD;
+    color: #1976D2;
+    border: none;
+    border-radius: 8px;
+    padding: 10px 24px;
+    min-height: 36px;
+    font-size: 15px;
+}
+QPushButton#secondarySmall:hover {
+    background: #BBDEFB;
+}
+QPushButton#secondary {
+    background: #E3F2FD;
+    color: #1976D2;
+    border: none;
+    border-radius: 8px;
+    padding: 12px 24px;
+    min-height: 40px;
+    font-size: 15px;
+    font-weight: 500;
+    margin-top: 10px;
+}
+QPushButton#secondary:hover {
+    background: #BBDEFB;
+}
+"""
+
 class UnifiedWidget(QWidget):
+    webServerReady = pyqtSignal(str)  # web server thread -> GUI thread; empty, or the import error
+
     def __init__(self):
         super().__init__()
+        self.webServerReady.connect(self._on_web_server_ready)
         # Change: peers now maps ip -> (name, last_seen_timestamp)
         self.peers: Dict[str, Tuple[str, float]] = {}  # ip -> (name, last_seen)
+        self._item_by_ip: Dict[str, QListWidgetItem] = {}
+        # (last_seen, ip) min-heap; entries superseded by a newer announce are skipped on pop
+        self._expiry_heap: List[Tuple[float, str]] = []
         self._listener = ListenerThread()
         self._listener.new_peer.connect(self._add_peer)
         self._listener.start()
@@ -620,9 +1440,13 @@ class UnifiedWidget(QWidget):
         self._current_ip = get_local_ip()
         self._web_thread = None
         self._web_server = None
+        self._web_server_path = None  # see _resolve_web_server_path
         self._sender_thread = None
         self._last_failed = None
+        self._tasks = set()  # control messages in flight
+        self._settings_dlg = None
 
+        self.setStyleSheet(BUTTON_STYLE)
         layout = QVBoxLayout(self)
         layout.setSpacing(18)
         layout.setContentsMargins(28, 24, 28, 24)
@@ -638,22 +1462,7 @@ class UnifiedWidget(QWidget):
         self.folder_lbl.setStyleSheet("color: #607D8B; font-size: 14px;")
         choose_btn = QPushButton("Change…")
         choose_btn.setCursor(Qt.PointingHandCursor)
-        choose_btn.setStyleSheet(
-            """
-            QPushButton {
-                background: #E3F2FD;
-                color: #1976D2;
-                border: none;
-                border-radius: 8px;
-                padding: 10px 24px;
-                min-height: 36px;
-                font-size: 15px;
-            }
-            QPushButton:hover {
-                background: #BBDEFB;
-            }
-            """
-        )
+        choose_btn.setObjectName("secondarySmall")
         choose_btn.clicked.connect(self._choose_folder)
         row.addWidget(self.folder_lbl)
         row.addWidget(choose_btn)
@@ -689,9 +1498,17 @@ class UnifiedWidget(QWidget):
         self._peer_timer.start(2000)  # every 2 seconds
 
         # Timer to check for IP changes
+        # Follow IP changes: netlink events where available, otherwise poll
+        self._ip_watcher = None
         self._ip_timer = QTimer(self)
         self._ip_timer.timeout.connect(self._check_ip_change)
-        self._ip_timer.start(2000)  # every 2 seconds
+        if pyroute2 is not None and sys.platform.startswith("linux"):
+            self._ip_watcher = AddressWatcherThread()
+            self._ip_watcher.changed.connect(self._apply_ip)
+            self._ip_watcher.finished.connect(self._on_ip_watcher_finished)
+            self._ip_watcher.start()
+        else:
+            self._ip_timer.start(int(LOCAL_IP_TTL * 1000))  # polls faster than this would only hit the cache
 
         # Drag area
         self.drag_area = DragLabel("Drop a file here to send →")
@@ -746,19 +1563,7 @@ class UnifiedWidget(QWidget):
         note_btn_row = QHBoxLayout()
         send_note_btn = QPushButton("Send Note")
         send_note_btn.setCursor(Qt.PointingHandCursor)
-        send_note_btn.setStyleSheet(
-            """
-            QPushButton {
-                background: #1976D2;
-                color: white;
-                border: none;
-                padding: 10px 24px;
-                border-radius: 8px;
-                font-size: 14px;
-            }
-            QPushButton:hover { background: #1565C0; }
-            """
-        )
+        send_note_btn.setObjectName("primarySmall")
         send_note_btn.clicked.connect(self._send_note)
         note_btn_row.addStretch(1)
         note_btn_row.addWidget(send_note_btn)
@@ -768,94 +1573,26 @@ class UnifiedWidget(QWidget):
         btn_row = QHBoxLayout()
         self.toggle_btn = QPushButton("Start Receiver")
         self.toggle_btn.setCursor(Qt.PointingHandCursor)
-        self.toggle_btn.setStyleSheet(
-            """
-            QPushButton {
-                background: #1976D2;
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 12px 30px;
-                min-height: 40px;
-                font-size: 16px;
-                font-weight: 500;
-                margin-top: 10px;
-            }
-            QPushButton:hover {
-                background: #1565C0;
-            }
-            """
-        )
+        self.toggle_btn.setObjectName("primary")
         self.toggle_btn.clicked.connect(self._toggle)
         btn_row.addWidget(self.toggle_btn)
         self.settings_btn = QPushButton("Settings")
         self.settings_btn.setCursor(Qt.PointingHandCursor)
-        self.settings_btn.setStyleSheet(
-            """
-            QPushButton {
-                background: #E3F2FD;
-                color: #1976D2;
-                border: none;
-                border-radius: 8px;
-                padding: 12px 24px;
-                min-height: 40px;
-                font-size: 15px;
-                font-weight: 500;
-                margin-top: 10px;
-            }
-            QPushButton:hover {
-                background: #BBDEFB;
-            }
-            """
-        )
+        self.settings_btn.setObjectName("secondary")
         self.settings_btn.clicked.connect(self._open_settings)
         btn_row.addWidget(self.settings_btn)
         
         # Add SCP Download button
         self.scp_btn = QPushButton("SCP Download")
         self.scp_btn.setCursor(Qt.PointingHandCursor)
-        self.scp_btn.setStyleSheet(
-            """
-            QPushButton {
-                background: #E3F2FD;
-                color: #1976D2;
-                border: none;
-                border-radius: 8px;
-                padding: 12px 24px;
-                min-height: 40px;
-                font-size: 15px;
-                font-weight: 500;
-                margin-top: 10px;
-            }
-            QPushButton:hover {
-                background: #BBDEFB;
-            }
-            """
-        )
+        self.scp_btn.setObjectName("secondary")
         self.scp_btn.clicked.connect(self._open_scp_dialog)
         btn_row.addWidget(self.scp_btn)
 
         # Add Web Server button
         self.web_btn = QPushButton("Start Web Server")
         self.web_btn.setCursor(Qt.PointingHandCursor)
-        self.web_btn.setStyleSheet(
-            """
-            QPushButton {
-                background: #E3F2FD;
-                color: #1976D2;
-                border: none;
-                border-radius: 8px;
-                padding: 12px 24px;
-                min-height: 40px;
-                font-size: 15px;
-                font-weight: 500;
-                margin-top: 10px;
-            }
-            QPushButton:hover {
-                background: #BBDEFB;
-            }
-            """
-        )
+        self.web_btn.setObjectName("secondary")
         self.web_btn.clicked.connect(self._toggle_web_server)
         btn_row.addWidget(self.web_btn)
         btn_row.addStretch(1)
@@ -868,40 +1605,53 @@ class UnifiedWidget(QWidget):
         # Prevent self-discovery
         if ip == self._current_ip:
             return
-        now = time.time()
+        now = time.monotonic()
+        heapq.heappush(self._expiry_heap, (now, ip))
         if ip in self.peers:
             # Update timestamp and name if changed
             old_name, _ = self.peers[ip]
             self.peers[ip] = (name, now)
             # If name changed, update UI
             if old_name != name:
-                for i in range(self.list_widget.count()):
-                    item = self.list_widget.item(i)
-                    if item.data(Qt.UserRole) == ip:
-                        item.setText(f"{name} ({ip})")
-                        break
+                item = self._item_by_ip.get(ip)
+                if item is not None:
+                    item.setText(f"{name} ({ip})")
         else:
             self.peers[ip] = (name, now)
             item = QListWidgetItem(f"{name} ({ip})")
             item.setData(Qt.UserRole, ip)
             self.list_widget.addItem(item)
+            self._item_by_ip[ip] = item
 
     def _remove_stale_peers(self):
         # Remove peers not seen in the last 2 × ANNOUNCE_INTERVAL seconds
-        threshold = time.time() - 2 * ANNOUNCE_INTERVAL
-        to_remove = [ip for ip, (_, last_seen) in self.peers.items() if last_seen < threshold]
-        for ip in to_remove:
+        threshold = time.monotonic() - 2 * ANNOUNCE_INTERVAL
+        heap = self._expiry_heap
+        stale = []
+        while heap and heap[0][0] < threshold:
+            last_seen, ip = heapq.heappop(heap)
+            peer = self.peers.get(ip)
+            if peer is None or peer[1] != last_seen:
+                continue  # seen again since this entry was pushed
             del self.peers[ip]
-            # Remove from list_widget
-            for i in range(self.list_widget.count() - 1, -1, -1):
-                item = self.list_widget.item(i)
-                if item.data(Qt.UserRole) == ip:
-                    self.list_widget.takeItem(i)
-                    break
-            # Deselect if the removed peer was selected
-            if self._chosen_ip == ip:
-                self._chosen_ip = None
-                self.status.setText("")
+            stale.append(ip)
+        if not stale:
+            return
+        # One repaint and no per-row selection signals for the whole batch
+        self.list_widget.setUpdatesEnabled(False)
+        blocker = QSignalBlocker(self.list_widget)
+        try:
+            for ip in stale:
+                item = self._item_by_ip.pop(ip, None)
+                if item is not None:
+                    self.list_widget.takeItem(self.list_widget.row(item))
+        finally:
+            blocker.unblock()
+            self.list_widget.setUpdatesEnabled(True)
+        # Deselect if the removed peer was selected
+        if self._chosen_ip in stale:
+            self._chosen_ip = None
+            self.status.setText("")
 
     def _select_peer(self, item: QListWidgetItem):
         ip = item.data(Qt.UserRole)
@@ -924,9 +1674,12 @@ class UnifiedWidget(QWidget):
         self._sender_thread = SenderThread(self._chosen_ip, path)
         self._sender_thread.progress.connect(self._update_progress)
         self._sender_thread.status.connect(self._handle_sender_status)
-        self._sender_thread.finished.connect(lambda: setattr(self, "_sender_thread", None))
+        self._sender_thread.finished.connect(self._on_sender_finished)
         self._sender_thread.start()
 
+    def _on_sender_finished(self):
+        self._sender_thread = None
+
     def _handle_sender_status(self, text: str):
         self.status.setText(text)
         if text.startswith("⚠"):
@@ -955,26 +1708,15 @@ class UnifiedWidget(QWidget):
         self._sender_thread = SenderThread(info["ip"], info["path"], resume=True)
         self._sender_thread.progress.connect(self._update_progress)
         self._sender_thread.status.connect(self._handle_sender_status)
-        self._sender_thread.finished.connect(lambda: setattr(self, "_sender_thread", None))
+        self._sender_thread.finished.connect(self._on_sender_finished)
         self._sender_thread.start()
 
     def _discard_last_transfer(self):
         if not self._last_failed:
             return
         info = self._last_failed
-        try:
-            sock = socket.create_connection((info["ip"], TCP_PORT), timeout=5)
-            try:
-                sock.settimeout(None)
-            except Exception:
-                pass
-            sock.sendall(CANCEL_HEADER)
-            sock.sendall(struct.pack("!I", len(info["name"])))
-            sock.sendall(info["name"].encode())
-            sock.close()
-            self.status.setText("Partial deleted ✓")
-        except Exception as e:
-            self.status.setText(f"⚠ {e}")
+        name_bytes = info["name"].encode()
+        self._send_control(info["ip"], CANCEL_HEADER + _U32.pack(len(name_bytes)) + name_bytes, "Partial deleted ✓")
         self.resume_btn.setVisible(False)
         self.discard_btn.setVisible(False)
         self._last_failed = None
@@ -989,14 +1731,14 @@ class UnifiedWidget(QWidget):
             QMessageBox.information(self, "Empty note", "Nothing to send!")
             return
         data = text.encode()
-        try:
-            with socket.create_connection((self._chosen_ip, TCP_PORT), timeout=5) as sock:
-                sock.sendall(NOTE_HEADER)
-                sock.sendall(struct.pack("!I", len(data)))
-                sock.sendall(data)
-            self.status.setText("Note sent ✓")
-        except Exception as e:
-            self.status.setText(f"⚠ {e}")
+        # Header, length and text in one write: one segment for short notes
+        self._send_control(self._chosen_ip, NOTE_HEADER + _U32.pack(len(data)) + data, "Note sent ✓")
+
+    def _send_control(self, ip, message, done_text):
+        # Connect and send on the thread pool: an unreachable receiver must not freeze the window
+        def done(_result, error):
+            self.status.setText(done_text if error is None else f"⚠ {error}")
+        submit_task(QThreadPool.globalInstance(), self._tasks, done, send_control_message, ip, message)
 
     def receive_note(self, text: str):
         cursor = self.note_edit.textCursor()
@@ -1038,20 +1780,36 @@ class UnifiedWidget(QWidget):
         self.status.setText(f"{percent}% • {speed:.1f} MB/s")
 
     def _open_settings(self):
-        global settings, BUFFER_SIZE, ANNOUNCE_INTERVAL, TCP_PORT
-        dlg = SettingsDialog(self)
+        global settings, _settings_dirty, BUFFER_SIZE, ANNOUNCE_INTERVAL, TCP_PORT, SOCKET_BUFFER, VERIFY_CRC, COMPRESS
+        # Built on first use and kept: later opens only refresh the values
+        if self._settings_dlg is None:
+            self._settings_dlg = SettingsDialog(self)
+        else:
+            self._settings_dlg.reload()
+        dlg = self._settings_dlg
         if dlg.exec_() == QDialog.Accepted:
             new_settings = dlg.get_settings()
             settings.update(new_settings)
             BUFFER_SIZE = settings["BUFFER_SIZE"]
             ANNOUNCE_INTERVAL = settings["ANNOUNCE_INTERVAL"]
             TCP_PORT = settings["TCP_PORT"]
-            save_settings(settings)
+            SOCKET_BUFFER = settings["SOCKET_BUFFER"]
+            VERIFY_CRC = settings["VERIFY_CRC"]
+            COMPRESS = settings["COMPRESS"]
+            _settings_dirty = True
             self._current_ip = get_local_ip()
             self.ip_lbl.setText(f"Your IP: {self._current_ip}  ·  Port: {TCP_PORT}")
 
     def _check_ip_change(self):
-        new_ip = get_local_ip()
+        self._apply_ip(get_local_ip())
+
+    def _on_ip_watcher_finished(self):
+        # The watcher only ends early on a netlink error; fall back to polling
+        if self._ip_watcher.running and not self._ip_timer.isActive():
+            self._ip_timer.start(int(LOCAL_IP_TTL * 1000))
+            self._check_ip_change()
+
+    def _apply_ip(self, new_ip):
         if new_ip != self._current_ip:
             self._current_ip = new_ip
             self.ip_lbl.setText(f"Your IP: {self._current_ip}  ·  Port: {TCP_PORT}")
@@ -1062,13 +1820,12 @@ class UnifiedWidget(QWidget):
                 self._announcer.start()
 
     def _open_scp_dialog(self):
-        dlg = SCPDialog(self)
-        if dlg.exec_() == QDialog.Accepted:
-            params = dlg.get_params()
-            if params:  # Only call if params are present (old mode)
-                self._scp_download(**params)
+        SCPDialog(self).exec_()
 
     def _resolve_web_server_path(self):
+        # Remembered once found, so every start uses the same server.py
+        if self._web_server_path is not None:
+            return self._web_server_path
         base_dir = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent))
         candidates = [
             base_dir / "FileDrop_Web" / "server.py",
@@ -1076,6 +1833,7 @@ class UnifiedWidget(QWidget):
         ]
         for path in candidates:
             if path.exists():
+                self._web_server_path = path
                 return path
         return None
 
@@ -1104,46 +1862,62 @@ class UnifiedWidget(QWidget):
                 "Web server not found. Ensure FileDrop_Web/server.py is bundled with the app.",
             )
             return
-        try:
-            web_dir = str(server_path.parent)
-            if web_dir not in sys.path:
-                sys.path.insert(0, web_dir)
-            vendor_dir = str(server_path.parent / "vendor")
-            if vendor_dir not in sys.path and Path(vendor_dir).exists():
-                sys.path.insert(0, vendor_dir)
-            import server as web_server  # type: ignore
-            import uvicorn  # type: ignore
-        except Exception as e:
-            QMessageBox.warning(
-                self,
-                "Web Server",
-                f"Web server dependencies are missing: {e}\\n"
-                "Install FileDrop_Web requirements before building the app.",
-            )
-            return
+        web_dir = str(server_path.parent)
+        if web_dir not in sys.path:
+            sys.path.insert(0, web_dir)
+        vendor_dir = str(server_path.parent / "vendor")
+        if vendor_dir not in sys.path and Path(vendor_dir).exists():
+            sys.path.insert(0, vendor_dir)
 
         def run():
+            # The first import of uvicorn/fastapi takes a noticeable while; keep it off the GUI thread
             try:
+                import server as web_server  # type: ignore
+                import uvicorn  # type: ignore
                 config = uvicorn.Config(
                     web_server.app,
                     host="0.0.0.0",
                     port=8000,
                     log_level="info",
+                    limit_concurrency=web_server.MAX_CONNECTIONS,
+                    ws_per_message_deflate=False,
                 )
+                # Set before the button comes back, so a stop click always finds the server
                 self._web_server = uvicorn.Server(config)
+            except Exception as e:
+                self.webServerReady.emit(str(e) or type(e).__name__)
+                return
+            self.webServerReady.emit("")
+            try:
                 self._web_server.run()
             except Exception:
                 pass
 
         self._web_thread = threading.Thread(target=run, daemon=True)
         self._web_thread.start()
+        # Stopping mid-import can't cancel it; the button returns with webServerReady
+        self.web_btn.setEnabled(False)
+        self.web_btn.setText("Starting Web Server…")
+
+    def _on_web_server_ready(self, error):
+        self.web_btn.setEnabled(True)
+        if error:
+            self._web_thread = None
+            self.web_btn.setText("Start Web Server")
+            QMessageBox.warning(
+                self,
+                "Web Server",
+                f"Web server dependencies are missing: {error}\\n"
+                "Install FileDrop_Web requirements before building the app.",
+            )
+            return
+        self.web_btn.setText("Stop Web Server")
         ip = get_local_ip()
         QMessageBox.information(
             self,
             "Web Server",
             f"Web server started. Open http://{ip}:8000 in a browser.",
         )
-        self.web_btn.setText("Stop Web Server")
 
     def _toggle_web_server(self):
         if self._web_thread and self._web_thread.is_alive():
@@ -1151,47 +1925,6 @@ class UnifiedWidget(QWidget):
         else:
             self._start_web_server()
 
-    def _scp_download(self, ip, port, username, password, remote_path, local_dir):
-        try:
-            import paramiko
-            from paramiko import SSHClient
-            import threading
-            from PyQt5.QtWidgets import QApplication
-        except ImportError:
-            QMessageBox.critical(self, "Missing Dependency", "Please install paramiko: pip install paramiko")
-            return
-        self.status.setText("Connecting via SCP…")
-        self.progress.setValue(0)
-        def run():
-            try:
-                ssh = paramiko.SSHClient()
-                ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                ssh.connect(ip, port=port, username=username, password=password, timeout=10)
-                sftp = ssh.open_sftp()
-                remote_size = sftp.stat(remote_path).st_size
-                local_path = os.path.join(local_dir, os.path.basename(remote_path))
-                with sftp.open(remote_path, 'rb') as remote_f, open(local_path, 'wb') as local_f:
-                    transferred = 0
-                    while True:
-                        chunk = remote_f.read(BUFFER_SIZE)
-                        if not chunk:
-                            break
-                        local_f.write(chunk)
-                        transferred += len(chunk)
-                        percent = int(transferred / remote_size * 100) if remote_size else 0
-                        speed = transferred / (1024*1024)  # MB, rough
-                        QApplication.instance().postEvent(self.progress, type('QEvent', (), {'type': lambda: 1000})())
-                        self.progress.setValue(percent)
-                        self.status.setText(f"SCP: {percent}% • {human_size(transferred)} / {human_size(remote_size)}")
-                sftp.close()
-                ssh.close()
-                self.status.setText(f"SCP: Downloaded {os.path.basename(remote_path)} ✓")
-                self.progress.setValue(100)
-            except Exception as e:
-                self.status.setText(f"SCP Error: {e}")
-                self.progress.setValue(0)
-        threading.Thread(target=run, daemon=True).start()
-
 # Settings dialog (optional / unchanged)
 
 class SettingsDialog(QDialog):
@@ -1201,34 +1934,64 @@ class SettingsDialog(QDialog):
         layout = QFormLayout(self)
 
         self.buffer_spin = QSpinBox()
-        self.buffer_spin.setRange(4, 1024)
-        self.buffer_spin.setSingleStep(8)
-        self.buffer_spin.setValue(settings["BUFFER_SIZE"] // 1024)
+        self.buffer_spin.setRange(4, 8192)
+        self.buffer_spin.setSingleStep(64)
         self.buffer_spin.setSuffix(" KB")
         layout.addRow("Buffer size:", self.buffer_spin)
 
         self.announce_spin = QDoubleSpinBox()
         self.announce_spin.setRange(0.5, 10.0)
         self.announce_spin.setSingleStep(0.1)
-        self.announce_spin.setValue(settings["ANNOUNCE_INTERVAL"])
         self.announce_spin.setSuffix(" s")
         layout.addRow("Announce interval:", self.announce_spin)
 
         self.port_spin = QSpinBox()
         self.port_spin.setRange(1024, 65535)
-        self.port_spin.setValue(settings["TCP_PORT"])
         layout.addRow("TCP port:", self.port_spin)
 
+        self.sockbuf_spin = QSpinBox()
+        self.sockbuf_spin.setRange(0, 16 * 1024)
+        self.sockbuf_spin.setSingleStep(256)
+        self.sockbuf_spin.setSpecialValueText("Auto")
+        self.sockbuf_spin.setSuffix(" KB")
+        self.sockbuf_spin.setToolTip("Fixed TCP socket buffer. Auto lets the OS tune it.")
+        layout.addRow("Socket buffer:", self.sockbuf_spin)
+
+        self.crc_check = QCheckBox("Verify files with CRC32C")
+        if crc32c is None:
+            self.crc_check.setEnabled(False)
+            self.crc_check.setToolTip("Install crc32c to enable: pip install crc32c")
+        else:
+            self.crc_check.setToolTip("The receiver must also run a FileDrop version with checksum support.")
+        layout.addRow("Integrity:", self.crc_check)
+
+        self.compress_check = QCheckBox("Compress SSH downloads")
+        self.compress_check.setToolTip("Compresses the whole SSH session. Helps text/logs on slow links; archives and media only cost CPU.")
+        layout.addRow("SCP:", self.compress_check)
+
         btns = QDialogButtonBox(QDialogButtonBox.Save | QDialogButtonBox.Cancel)
         btns.accepted.connect(self.accept)
         btns.rejected.connect(self.reject)
         layout.addWidget(btns)
+        self.reload()
+
+    def reload(self):
+        # Called again each time the kept dialog is reopened, so cancelled edits do not stick
+        self.buffer_spin.setValue(settings["BUFFER_SIZE"] // 1024)
+        self.announce_spin.setValue(settings["ANNOUNCE_INTERVAL"])
+        self.port_spin.setValue(settings["TCP_PORT"])
+        self.sockbuf_spin.setValue(settings["SOCKET_BUFFER"] // 1024)
+        self.crc_check.setChecked(settings["VERIFY_CRC"] and crc32c is not None)
+        self.compress_check.setChecked(settings["COMPRESS"])
 
     def get_settings(self):
         return {
             "BUFFER_SIZE": self.buffer_spin.value() * 1024,
             "ANNOUNCE_INTERVAL": self.announce_spin.value(),
             "TCP_PORT": self.port_spin.value(),
+            "SOCKET_BUFFER": self.sockbuf_spin.value() * 1024,
+            "VERIFY_CRC": self.crc_check.isChecked(),
+            "COMPRESS": self.compress_check.isChecked(),
         }
 
 # Main Window
@@ -1256,28 +2019,33 @@ class MainWindow(QWidget):
         unified = UnifiedWidget()
         v.addWidget(unified)
 
+# Light palette forced regardless of the OS theme
+LIGHT_PALETTE = (
+    (QPalette.Window, 0xFFFFFF),
+    (QPalette.WindowText, 0x000000),
+    (QPalette.Base, 0xF5F5F5),
+    (QPalette.AlternateBase, 0xFFFFFF),
+    (QPalette.ToolTipBase, 0xFFFFDC),
+    (QPalette.ToolTipText, 0x000000),
+    (QPalette.Text, 0x000000),
+    (QPalette.Button, 0xF0F0F0),
+    (QPalette.ButtonText, 0x000000),
+    (QPalette.BrightText, 0xFF0000),
+    (QPalette.Link, 0x0078D7),
+    (QPalette.Highlight, 0x0078D7),
+    (QPalette.HighlightedText, 0xFFFFFF),
+)
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
 
     # Force light mode
-    from PyQt5.QtGui import QPalette, QColor
     app.setStyle("Fusion")
     palette = QPalette()
-    palette.setColor(QPalette.Window, QColor(255, 255, 255))
-    palette.setColor(QPalette.WindowText, QColor(0, 0, 0))
-    palette.setColor(QPalette.Base, QColor(245, 245, 245))
-    palette.setColor(QPalette.AlternateBase, QColor(255, 255, 255))
-    palette.setColor(QPalette.ToolTipBase, QColor(255, 255, 220))
-    palette.setColor(QPalette.ToolTipText, QColor(0, 0, 0))
-    palette.setColor(QPalette.Text, QColor(0, 0, 0))
-    palette.setColor(QPalette.Button, QColor(240, 240, 240))
-    palette.setColor(QPalette.ButtonText, QColor(0, 0, 0))
-    palette.setColor(QPalette.BrightText, QColor(255, 0, 0))
-    palette.setColor(QPalette.Link, QColor(0, 120, 215))
-    palette.setColor(QPalette.Highlight, QColor(0, 120, 215))
-    palette.setColor(QPalette.HighlightedText, QColor(255, 255, 255))
+    for role, rgb in LIGHT_PALETTE:
+        palette.setColor(role, QColor(rgb))
     app.setPalette(palette)
 
     win = MainWindow(); win.resize(640, 680); win.show()
-    if app.exec_() == 0:
+    if app.exec_() == 0 and _settings_dirty:
         save_settings(settings)
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 import importlib.metadata as md
+import os
 import re
 import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parent
@@ -18,17 +22,39 @@ ROOTS = [
 
 NAME_RE = re.compile(r"^[A-Za-z0-9_.-]+")
 
+# Not needed at runtime; .dist-info stays whole since packages read their own metadata
+SKIP_DIRS = {"__pycache__", "tests"}
+SKIP_SUFFIXES = {".pyc", ".pyo", ".pyi", ".c", ".h"}
+
 
 def norm(name: str) -> str:
     return re.sub(r"[-_.]+", "-", name).lower()
 
 
+@lru_cache(maxsize=None)
 def parse_req_name(req: str) -> str | None:
     req = req.split(";", 1)[0].strip()
     m = NAME_RE.match(req)
     return norm(m.group(0)) if m else None
 
 
+def copy_one(task: tuple[Path, Path]) -> None:
+    src, dest = task
+    if src.is_dir():
+        if not dest.exists():
+            shutil.copytree(src, dest, symlinks=False)
+        return
+    # A hard link moves no data. Metadata gets a real copy in case a packaging
+    # step rewrites it, which must not reach site-packages.
+    if not any(part.endswith(".dist-info") for part in dest.parts):
+        try:
+            os.link(src, dest)
+            return
+        except OSError:
+            pass  # other filesystem, or links not allowed here
+    shutil.copy2(src, dest)
+
+
 def main() -> None:
     installed: dict[str, md.Distribution] = {}
     for dist in md.distributions():
@@ -37,20 +63,17 @@ def main() -> None:
             installed[norm(name)] = dist
 
     wanted: dict[str, md.Distribution] = {}
-
-    def add_dist(name: str) -> None:
-        key = norm(name)
+    queue = deque(norm(name) for name in ROOTS)
+    while queue:
+        key = queue.popleft()
         dist = installed.get(key)
         if not dist or key in wanted:
-            return
+            continue
         wanted[key] = dist
         for req in dist.requires or []:
             dep_key = parse_req_name(req)
-            if dep_key and dep_key in installed:
-                add_dist(dep_key)
-
-    for name in ROOTS:
-        add_dist(name)
+            if dep_key and dep_key in installed and dep_key not in wanted:
+                queue.append(dep_key)
 
     VENDOR.mkdir(parents=True, exist_ok=True)
     for child in VENDOR.iterdir():
@@ -59,23 +82,24 @@ def main() -> None:
         else:
             child.unlink()
 
-    copied = 0
+    tasks: list[tuple[Path, Path]] = []
     for dist in wanted.values():
         files = dist.files or []
         for file in files:
-            if ".." in file.parts:
+            if ".." in file.parts or SKIP_DIRS.intersection(file.parts) or file.suffix in SKIP_SUFFIXES:
                 continue
             src = dist.locate_file(file)
             if not src.exists():
                 continue
-            dest = VENDOR / file
-            dest.parent.mkdir(parents=True, exist_ok=True)
-            if src.is_dir():
-                if not dest.exists():
-                    shutil.copytree(src, dest, symlinks=False)
-            else:
-                shutil.copy2(src, dest)
-            copied += 1
+            tasks.append((Path(src), VENDOR / file))
+
+    # Directories first and in order, so the copy workers never race on mkdir
+    for parent in sorted({dest.parent for _, dest in tasks}):
+        parent.mkdir(parents=True, exist_ok=True)
+    # Thousands of small files: the time goes into open/stat/close, which threads overlap
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+        list(pool.map(copy_one, tasks))  # re-raises the first copy error
+    copied = len(tasks)
 
     print(f"Vendor prepared: {VENDOR}")
     print(f"Distributions copied: {len(wanted)}")
@@ -26,17 +26,22 @@ except Exception:  # pragma: no cover - py<3.9 fallback
         import backports.zoneinfo as zoneinfo  # noqa: F401
     except Exception:
         zoneinfo = None  # noqa: F401
+import functools
 import json
 import os
 import socket
 import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from pathlib import Path
+from stat import S_ISREG
 from typing import Dict, Optional, List
 import asyncio
 
 from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 
@@ -45,8 +50,19 @@ try:
 except Exception:  # pragma: no cover - optional dependency
     qrcode = None
 
+try:
+    import orjson
+except Exception:  # pragma: no cover - optional dependency
+    orjson = None
+
 APP_NAME = "FileDrop Web"
 DEFAULT_PORT = 8000
+CLIENT_QUEUE_SIZE = 64  # pending messages per client before it counts as too slow
+MAX_BATCH = 32  # queued messages the writer may coalesce into one frame
+SEND_TIMEOUT = 5.0  # seconds a single client may take to accept a message
+UPLOAD_CHUNK = 4 * 1024 * 1024
+MAX_CONNECTIONS = 1024  # uvicorn answers 503 beyond this many concurrent connections/tasks
+MAX_WS_CLIENTS = 512
 
 app = FastAPI()
 
@@ -55,10 +71,26 @@ STATE = {
     "port": DEFAULT_PORT,
     "save_dir": Path.home() / "Downloads" / "FileDrop",
     "access_code": "",
-    "clients": {},  # session_id -> {"name": str, "client_id": str, "ws": WebSocket, "can_receive": bool}
+    # session_id -> {"name": str, "client_id": str, "ws": WebSocket, "can_receive": bool,
+    #                "queue": asyncio.Queue, "writer": asyncio.Task}
+    "clients": {},
+    "by_client_id": {},  # client_id -> set of its session_ids
+    "receiving": set(),  # session_ids currently accepting files
+    "admins": set(),  # session_ids connected from this machine
+    "clients_snapshot": None,  # encoded "clients" message; None once the list has changed
     "file_index": {},  # filename -> {"targets": Optional[List[str]], "size": int, "ts": int, "from": str}
 }
 
+LAN_IP_TTL = 30.0  # re-resolve the LAN address at most this often
+_lan_ip_cache = (0.0, "127.0.0.1", frozenset({"127.0.0.1", "::1"}))  # (expires_at, ip, local hosts)
+
+QR_CACHE_SIZE = 16
+SUFFIX_CACHE_SIZE = 256  # upload names whose last " (n)" is remembered
+
+_tk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="filedrop-tk")  # Tk wants one thread
+_suffix_counters: Dict[tuple, int] = OrderedDict()  # (directory, stem, suffix) -> last " (n)" used, LRU order
+_listing_cache = (None, 0, [])  # (directory, its st_mtime_ns, [(name, size, mtime)])
+
 BASE_DIR = Path(__file__).parent
 STATIC_DIR = BASE_DIR / "static"
 
@@ -79,7 +111,7 @@ def _score_ip(ip: str) -> int:
     return 0
 
 
-def get_lan_ip() -> str:
+def _compute_lan_ip() -> str:
     try:
         for iface in socket.getaddrinfo(socket.gethostname(), None):
             ip = iface[4][0]
@@ -109,6 +141,24 @@ def get_lan_ip() -> str:
         return "127.0.0.1"
 
 
+def get_lan_ip() -> str:
+    return _lan_ip_state()[1]
+
+
+def local_hosts() -> frozenset:
+    # Addresses that count as this machine, i.e. an admin connection
+    return _lan_ip_state()[2]
+
+
+def _lan_ip_state() -> tuple:
+    global _lan_ip_cache
+    now = time.monotonic()
+    if now >= _lan_ip_cache[0]:
+        ip = _compute_lan_ip()
+        _lan_ip_cache = (now + LAN_IP_TTL, ip, frozenset({"127.0.0.1", "::1", ip}))
+    return _lan_ip_cache
+
+
 def sanitize_name(name: str) -> str:
     name = (name or "").strip()
     if not name:
@@ -127,102 +177,256 @@ def unique_path(directory: Path, filename: str) -> Path:
         return dest
     stem = dest.stem
     suffix = dest.suffix
-    counter = 1
+    # Resume from the last number handed out so repeated uploads don't re-probe every taken name
+    key = (directory, stem, suffix)
+    counters = _suffix_counters  # forget_suffixes() may swap in a new dict from a worker thread
+    counter = counters.get(key, 0) + 1
     while True:
         candidate = directory / f"{stem} ({counter}){suffix}"
         if not candidate.exists():
+            counters[key] = counter
+            counters.move_to_end(key)
+            if len(counters) > SUFFIX_CACHE_SIZE:
+                counters.popitem(last=False)
             return candidate
         counter += 1
 
 
-def require_code(request: Request, code: str | None = None) -> None:
+def forget_suffixes() -> None:
+    # A removed file frees its " (n)"; probe from 1 again so the number gets reused
+    global _suffix_counters
+    _suffix_counters = OrderedDict()
+
+
+def invalidate_listing() -> None:
+    global _listing_cache
+    _listing_cache = (None, 0, [])
+
+
+def dir_listing(directory: Path) -> list:
+    # Clients poll /api/files; rescan only when the directory itself changed (or we changed it)
+    global _listing_cache
+    dir_mtime = directory.stat().st_mtime_ns
+    cached_dir, cached_mtime, entries = _listing_cache
+    if cached_dir == directory and cached_mtime == dir_mtime:
+        return entries
+    with os.scandir(directory) as it:
+        found = [e for e in it if not e.name.startswith(".") and e.is_file()]
+    found.sort(key=lambda e: e.name.lower())
+    entries = []
+    for entry in found:
+        stat = entry.stat()
+        entries.append((entry.name, stat.st_size, int(stat.st_mtime)))
+    _listing_cache = (directory, dir_mtime, entries)
+    return entries
+
+
+def code_matches(supplied) -> bool:
     access_code = STATE["access_code"]
     if not access_code:
+        return True
+    if not isinstance(supplied, str):
+        return False
+    return hmac.compare_digest(supplied.encode(), access_code.encode())
+
+
+def store_upload(src, dst) -> int:
+    # Starlette spools uploads over 1 MiB to a temp file; copy those in the kernel instead of through Python
+    src.seek(0)
+    offset = 0
+    if hasattr(os, "sendfile") and getattr(src, "_rolled", True):
+        try:
+            src_fd = src.fileno()
+            dst_fd = dst.fileno()
+            while True:
+                sent = os.sendfile(dst_fd, src_fd, offset, UPLOAD_CHUNK)
+                if not sent:
+                    return offset
+                offset += sent
+        except OSError:
+            # e.g. platforms whose sendfile only writes to sockets; carry on from where it stopped
+            src.seek(offset)
+            dst.seek(offset)
+    size = offset
+    while True:
+        chunk = src.read(UPLOAD_CHUNK)
+        if not chunk:
+            return size
+        dst.write(chunk)
+        size += len(chunk)
+
+
+def require_code(request: Request, code: str | None = None) -> None:
+    if not STATE["access_code"]:
         return
     header_code = request.headers.get("x-filedrop-code")
     query_code = request.query_params.get("code")
     supplied = code or header_code or query_code
-    if supplied != access_code:
+    if not code_matches(supplied):
         raise HTTPException(status_code=401, detail="Invalid access code")
 
 
-async def broadcast(message: dict) -> None:
-    dead = []
-    for client_id, info in STATE["clients"].items():
-        ws = info["ws"]
-        try:
-            await ws.send_text(json.dumps(message))
-        except Exception:
-            dead.append(client_id)
-    for client_id in dead:
-        STATE["clients"].pop(client_id, None)
+def dumps(message: dict) -> str:
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, separators=(",", ":"))
 
 
-async def broadcast_except(session_id: str, message: dict) -> None:
-    dead = []
-    for cid, info in STATE["clients"].items():
-        if cid == session_id:
+def loads(raw: str) -> dict:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+async def _close(ws: WebSocket, code: int = 1000) -> None:
+    try:
+        await asyncio.wait_for(ws.close(code=code), SEND_TIMEOUT)
+    except Exception:
+        pass
+
+
+async def _writer_loop(ws: WebSocket, queue: asyncio.Queue) -> None:
+    # The only coroutine that writes to this socket; a stuck client stalls nobody else
+    try:
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < MAX_BATCH and not queue.empty():
+                batch.append(queue.get_nowait())
+            if len(batch) == 1:
+                text = batch[0]
+            else:
+                # Already-encoded messages, so the batch frame is built without re-encoding
+                text = '{"type":"batch","items":[' + ",".join(batch) + "]}"
+            await asyncio.wait_for(ws.send_text(text), SEND_TIMEOUT)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        await _close(ws)
+
+
+def register_session(session_id: str, info: dict) -> None:
+    STATE["clients"][session_id] = info
+    STATE["clients_snapshot"] = None
+    STATE["by_client_id"].setdefault(info["client_id"], set()).add(session_id)
+    if info["is_admin"]:
+        STATE["admins"].add(session_id)
+    set_can_receive(session_id, info["can_receive"])
+
+
+def set_can_receive(session_id: str, can_receive: bool) -> None:
+    STATE["clients"][session_id]["can_receive"] = can_receive
+    STATE["clients_snapshot"] = None
+    if can_receive:
+        STATE["receiving"].add(session_id)
+    else:
+        STATE["receiving"].discard(session_id)
+
+
+def drop_session(session_id: str) -> Optional[dict]:
+    info = STATE["clients"].pop(session_id, None)
+    if not info:
+        return None
+    info["writer"].cancel()
+    STATE["clients_snapshot"] = None
+    sessions = STATE["by_client_id"].get(info["client_id"])
+    if sessions is not None:
+        sessions.discard(session_id)
+        if not sessions:
+            del STATE["by_client_id"][info["client_id"]]
+    STATE["receiving"].discard(session_id)
+    STATE["admins"].discard(session_id)
+    return info
+
+
+def is_receiving(client_id: str) -> bool:
+    receiving = STATE["receiving"]
+    return any(sid in receiving for sid in STATE["by_client_id"].get(client_id, ()))
+
+
+def has_receiver_besides(client_id: str | None) -> bool:
+    clients = STATE["clients"]
+    return any(clients[sid]["client_id"] != client_id for sid in STATE["receiving"])
+
+
+async def send_to_sessions(session_ids, message: dict) -> None:
+    await send_text_to_sessions(session_ids, dumps(message))
+
+
+async def send_text_to_sessions(session_ids, text: str) -> None:
+    clients = STATE["clients"]
+    slow = []
+    for sid in session_ids:
+        info = clients.get(sid)
+        if not info:
             continue
-        ws = info["ws"]
         try:
-            await ws.send_text(json.dumps(message))
-        except Exception:
-            dead.append(cid)
-    for cid in dead:
-        STATE["clients"].pop(cid, None)
+            info["queue"].put_nowait(text)
+        except asyncio.QueueFull:
+            slow.append(sid)
+    if not slow:
+        return
+    # Drop every slow client in one pass, close them together and tell the others once
+    dropped = [info for info in map(drop_session, slow) if info]
+    await asyncio.gather(*(_close(info["ws"], code=1013) for info in dropped))
+    if dropped:
+        await broadcast_clients()
+
+
+async def broadcast(message: dict) -> None:
+    await send_to_sessions(list(STATE["clients"]), message)
+
+
+async def broadcast_except(session_id: str, message: dict) -> None:
+    await send_to_sessions([sid for sid in STATE["clients"] if sid != session_id], message)
 
 
 async def notify_session(session_id: str, message: dict) -> None:
-    info = STATE["clients"].get(session_id)
-    if not info:
-        return
-    try:
-        await info["ws"].send_text(json.dumps(message))
-    except Exception:
-        STATE["clients"].pop(session_id, None)
+    await send_to_sessions([session_id], message)
 
 
 async def notify_target(target_id: str, message: dict) -> None:
-    for session_id, info in STATE["clients"].items():
-        if info["client_id"] == target_id:
-            await notify_session(session_id, message)
+    await notify_targets([target_id], message)
 
 
 async def notify_targets(target_ids: List[str], message: dict) -> None:
-    for target_id in target_ids:
-        await notify_target(target_id, message)
+    by_client_id = STATE["by_client_id"]
+    await send_to_sessions(
+        [sid for target_id in set(target_ids) for sid in by_client_id.get(target_id, ())],
+        message,
+    )
 
 
 def is_admin_client(client_id: str | None) -> bool:
     if not client_id:
         return False
-    return any(
-        info.get("is_admin") and info.get("client_id") == client_id
-        for info in STATE["clients"].values()
-    )
+    admins = STATE["admins"]
+    return any(sid in admins for sid in STATE["by_client_id"].get(client_id, ()))
 
 
 def is_admin_request(request: Request, client_id: str | None) -> bool:
     if is_admin_client(client_id):
         return True
     remote_host = getattr(request.client, "host", "")
-    lan_ip = get_lan_ip()
-    return remote_host in {"127.0.0.1", "::1", lan_ip}
+    return remote_host in local_hosts()
 
 
 async def kick_session(session_id: str) -> None:
     info = STATE["clients"].get(session_id)
     if not info:
         return
-    try:
-        await info["ws"].close(code=4000)
-    except Exception:
-        pass
-    STATE["clients"].pop(session_id, None)
+    drop_session(session_id)
+    await _close(info["ws"], code=4000)
     await broadcast_clients()
 
 
 async def broadcast_clients() -> None:
+    # Rebuilt only after the client list actually changed
+    if STATE["clients_snapshot"] is None:
+        STATE["clients_snapshot"] = _clients_snapshot()
+    await send_text_to_sessions(list(STATE["clients"]), STATE["clients_snapshot"])
+
+
+def _clients_snapshot() -> str:
     items = [
         {
             "session_id": session_id,
@@ -233,7 +437,7 @@ async def broadcast_clients() -> None:
         }
         for session_id, info in STATE["clients"].items()
     ]
-    await broadcast({"type": "clients", "items": items})
+    return dumps({"type": "clients", "items": items})
 
 
 @app.get("/")
@@ -250,7 +454,7 @@ def info(request: Request) -> dict:
     origin = f"{scheme}://{host}" if host else ""
     lan_url = f"http://{lan_ip}:{port}"
     remote_host = getattr(request.client, "host", "")
-    is_admin = remote_host in {"127.0.0.1", "::1", lan_ip}
+    is_admin = remote_host in local_hosts()
     return {
         "name": APP_NAME,
         "lan_ip": lan_ip,
@@ -277,9 +481,8 @@ def get_settings(request: Request) -> dict:
 async def update_settings(request: Request) -> dict:
     data = await request.json()
     code = data.get("code")
-    if STATE["access_code"]:
-        if code != STATE["access_code"]:
-            raise HTTPException(status_code=401, detail="Invalid access code")
+    if not code_matches(code):
+        raise HTTPException(status_code=401, detail="Invalid access code")
     save_dir = data.get("save_dir")
     if save_dir:
         STATE["save_dir"] = Path(save_dir)
@@ -308,12 +511,17 @@ async def save_dialog(request: Request) -> dict:
         from tkinter import filedialog
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=f"Folder picker not available: {exc}") from exc
-    try:
+    def pick_folder() -> str:
         root = tkinter.Tk()
         root.withdraw()
         root.update()
         path = filedialog.askdirectory()
         root.destroy()
+        return path
+
+    try:
+        # The dialog stays open for as long as the user takes; run it off the event loop
+        path = await asyncio.get_running_loop().run_in_executor(_tk_executor, pick_folder)
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=f"Folder picker failed: {exc}") from exc
     if not path:
@@ -330,6 +538,15 @@ async def save_dialog(request: Request) -> dict:
     return {"ok": True, "save_dir": str(STATE["save_dir"])}
 
 
+@functools.lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr(url: str) -> bytes:
+    # qr() runs in the threadpool; lru_cache is safe to share between its threads
+    img = qrcode.make(url)
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
 @app.get("/api/qr")
 def qr(request: Request, url: str | None = None) -> Response:
     if qrcode is None:
@@ -338,35 +555,33 @@ def qr(request: Request, url: str | None = None) -> Response:
         host = request.headers.get("host")
         scheme = request.headers.get("x-forwarded-proto", request.url.scheme)
         url = f"{scheme}://{host}" if host else ""
-    img = qrcode.make(url)
-    buf = BytesIO()
-    img.save(buf, format="PNG")
-    return Response(content=buf.getvalue(), media_type="image/png")
+    png = render_qr(url)
+    return Response(content=png, media_type="image/png", headers={"Cache-Control": "public, max-age=300"})
 
 
 @app.get("/api/files")
 def list_files(request: Request) -> dict:
     require_code(request)
-    ensure_dir(STATE["save_dir"])
     client_id = request.headers.get("x-filedrop-client") or request.query_params.get("client_id")
+    try:
+        listing = dir_listing(STATE["save_dir"])
+    except FileNotFoundError:
+        ensure_dir(STATE["save_dir"])
+        listing = dir_listing(STATE["save_dir"])
     files = []
-    for entry in sorted(STATE["save_dir"].iterdir(), key=lambda p: p.name.lower()):
-        if entry.name.startswith("."):
+    for name, size, mtime in listing:
+        meta = STATE["file_index"].get(name)
+        targets = meta.get("targets") if meta else None
+        if targets and client_id not in targets:
             continue
-        if entry.is_file():
-            stat = entry.stat()
-            meta = STATE["file_index"].get(entry.name)
-            targets = meta.get("targets") if meta else None
-            if targets and client_id not in targets:
-                continue
-            files.append(
-                {
-                    "name": entry.name,
-                    "size": stat.st_size,
-                    "mtime": int(stat.st_mtime),
-                    "private": bool(targets),
-                }
-            )
+        files.append(
+            {
+                "name": name,
+                "size": size,
+                "mtime": mtime,
+                "private": bool(targets),
+            }
+        )
     return {"files": files}
 
 
@@ -380,9 +595,13 @@ def download_file(filename: str, request: Request) -> FileResponse:
     if targets and client_id not in targets:
         raise HTTPException(status_code=403, detail="Not authorized")
     path = STATE["save_dir"] / safe_name
-    if not path.exists() or not path.is_file():
+    try:
+        stat_result = path.stat()
+    except OSError:
+        stat_result = None
+    if stat_result is None or not S_ISREG(stat_result.st_mode):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(path, filename=safe_name)
+    return FileResponse(path, filename=safe_name, stat_result=stat_result)
 
 
 @app.delete("/api/files/{filename}")
@@ -400,6 +619,8 @@ def delete_file(filename: str, request: Request) -> dict:
     if not path.exists() or not path.is_file():
         raise HTTPException(status_code=404, detail="File not found")
     path.unlink()
+    invalidate_listing()
+    forget_suffixes()
     STATE["file_index"].pop(safe_name, None)
     return {"ok": True}
 
@@ -415,14 +636,9 @@ async def upload_file(
 ) -> dict:
     require_code(request, code)
     # Require at least one receiver (other than sender) to avoid saving only locally
-    receivers = {
-        info["client_id"]
-        for info in STATE["clients"].values()
-        if info.get("can_receive", True) and info.get("client_id") != client_id
-    }
     if target_ids:
         requested = [t for t in target_ids.split(",") if t]
-        valid_targets = [t for t in requested if t in receivers]
+        valid_targets = [t for t in requested if t != client_id and is_receiving(t)]
         if not valid_targets:
             raise HTTPException(status_code=409, detail="No receivers connected")
         # Include sender so they can see the file in their list.
@@ -430,36 +646,35 @@ async def upload_file(
             valid_targets.append(client_id)
         targets = valid_targets
     else:
-        if not receivers:
+        if not has_receiver_besides(client_id):
             raise HTTPException(status_code=409, detail="No receivers connected")
         targets = None
 
     ensure_dir(STATE["save_dir"])
     dest = unique_path(STATE["save_dir"], file.filename)
-    size = 0
     with dest.open("wb") as f:
-        while True:
-            chunk = await file.read(1024 * 1024)
-            if not chunk:
-                break
-            f.write(chunk)
-            size += len(chunk)
+        # Disk I/O goes to the threadpool so a slow disk doesn't stall the event loop
+        size = await run_in_threadpool(store_upload, file.file, f)
     await file.close()
+    # The directory mtime was bumped when the file was created, before its final size was known
+    invalidate_listing()
+    now = int(time.time())
+    sender = sanitize_name(name)
     meta = {
         "targets": targets,
         "size": size,
-        "ts": int(time.time()),
-        "from": sanitize_name(name),
+        "ts": now,
+        "from": sender,
     }
     STATE["file_index"][dest.name] = meta
     payload = {
         "type": "file",
         "name": dest.name,
         "size": size,
-        "from": sanitize_name(name),
+        "from": sender,
         "client_id": client_id,
         "targets": targets,
-        "ts": int(time.time()),
+        "ts": now,
     }
     if targets:
         await notify_targets(targets, payload)
@@ -470,34 +685,30 @@ async def upload_file(
 
 @app.websocket("/ws")
 async def ws_endpoint(websocket: WebSocket) -> None:
+    if len(STATE["clients"]) >= MAX_WS_CLIENTS:
+        await websocket.close(code=1013)
+        return
     await websocket.accept()
     session_id = None
     try:
         hello = await websocket.receive_text()
-        data = json.loads(hello)
+        data = loads(hello)
         if data.get("type") != "hello":
             await websocket.close(code=1002)
             return
-        if STATE["access_code"] and data.get("code") != STATE["access_code"]:
-            await websocket.send_text(json.dumps({"type": "error", "code": "unauthorized"}))
+        if not code_matches(data.get("code")):
+            await websocket.send_text(dumps({"type": "error", "code": "unauthorized"}))
             await websocket.close(code=1008)
             return
         name = sanitize_name(data.get("name"))
         can_receive = bool(data.get("can_receive", True))
         remote_host = getattr(websocket.client, "host", "")
-        lan_ip = get_lan_ip()
-        is_admin = remote_host in {"127.0.0.1", "::1", lan_ip}
+        is_admin = remote_host in local_hosts()
         client_id = data.get("client_id") or str(uuid.uuid4())
         session_id = str(uuid.uuid4())
-        STATE["clients"][session_id] = {
-            "name": name,
-            "client_id": client_id,
-            "ws": websocket,
-            "can_receive": can_receive,
-            "is_admin": is_admin,
-        }
-        await websocket.send_text(
-            json.dumps(
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        queue.put_nowait(
+            dumps(
                 {
                     "type": "welcome",
                     "session_id": session_id,
@@ -512,10 +723,22 @@ async def ws_endpoint(websocket: WebSocket) -> None:
                 }
             )
         )
+        register_session(
+            session_id,
+            {
+                "name": name,
+                "client_id": client_id,
+                "ws": websocket,
+                "can_receive": can_receive,
+                "is_admin": is_admin,
+                "queue": queue,
+                "writer": asyncio.create_task(_writer_loop(websocket, queue)),
+            },
+        )
         await broadcast_clients()
         while True:
             raw = await websocket.receive_text()
-            msg = json.loads(raw)
+            msg = loads(raw)
             mtype = msg.get("type")
             if mtype == "note":
                 payload = {
@@ -528,31 +751,29 @@ async def ws_endpoint(websocket: WebSocket) -> None:
                 }
                 targets = msg.get("to")
                 if isinstance(targets, list) and targets:
-                    await asyncio.gather(*(notify_session(t, payload) for t in targets))
+                    await send_to_sessions(targets, payload)
                 else:
                     await broadcast_except(session_id, payload)
             elif mtype == "ping":
-                await websocket.send_text(json.dumps({"type": "pong"}))
+                await send_to_sessions([session_id], {"type": "pong"})
             elif mtype == "kick":
                 target = msg.get("target")
                 code = msg.get("code")
-                if STATE["access_code"] and code != STATE["access_code"]:
+                if not code_matches(code):
                     continue
                 if target:
                     await kick_session(target)
             elif mtype == "mode":
                 can_receive = bool(msg.get("can_receive", True))
-                info = STATE["clients"].get(session_id)
-                if info:
-                    info["can_receive"] = can_receive
+                if session_id in STATE["clients"]:
+                    set_can_receive(session_id, can_receive)
                     await broadcast_clients()
     except WebSocketDisconnect:
         pass
     except Exception:
         pass
     finally:
-        if session_id and session_id in STATE["clients"]:
-            STATE["clients"].pop(session_id, None)
+        if session_id and drop_session(session_id):
             await broadcast_clients()
 
 
@@ -587,6 +808,8 @@ def main() -> None:
         port=args.port,
         reload=False,
         log_level="info",
+        limit_concurrency=MAX_CONNECTIONS,
+        ws_per_message_deflate=False,
     )
 
 
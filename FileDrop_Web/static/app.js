@@ -159,45 +159,11 @@ function connect() {
 
   state.ws.onmessage = (event) => {
     const msg = JSON.parse(event.data);
-    if (msg.type === "welcome") {
-      state.connected = true;
-      state.sessionId = msg.session_id;
-      state.deviceId = msg.client_id;
-      state.isAdmin = Boolean(msg.is_admin);
-      connectBtn.textContent = "Disconnect";
-      setStatus(`Connected as ${msg.name}`, true);
-      updateAdminUI();
-      return;
-    }
-    if (msg.type === "error") {
-      setStatus("Access denied. Check access code.");
-      disconnect();
-      return;
-    }
-    if (msg.type === "clients") {
-      state.clients = msg.items || [];
-      syncSelections();
-      renderClients(state.clients);
-      updateTargetLabels();
-      return;
-    }
-    if (msg.type === "note") {
-      appendNote(msg);
-      return;
-    }
-    if (msg.type === "file") {
-      refreshFiles();
-      const from = msg.from ? ` from ${msg.from}` : "";
-      uploadStatus.textContent = `New file${from}: ${msg.name}`;
-      return;
-    }
-    if (msg.type === "settings") {
-      saveDirLabel.textContent = msg.save_dir || saveDirLabel.textContent;
-      if (msg.requires_code) {
-        codeField.style.display = "flex";
-      }
+    if (msg.type === "batch") {
+      (msg.items || []).forEach(handleMessage);
       return;
     }
+    handleMessage(msg);
   };
 
   state.ws.onclose = () => {
@@ -205,6 +171,48 @@ function connect() {
   };
 }
 
+function handleMessage(msg) {
+  if (msg.type === "welcome") {
+    state.connected = true;
+    state.sessionId = msg.session_id;
+    state.deviceId = msg.client_id;
+    state.isAdmin = Boolean(msg.is_admin);
+    connectBtn.textContent = "Disconnect";
+    setStatus(`Connected as ${msg.name}`, true);
+    updateAdminUI();
+    return;
+  }
+  if (msg.type === "error") {
+    setStatus("Access denied. Check access code.");
+    disconnect();
+    return;
+  }
+  if (msg.type === "clients") {
+    state.clients = msg.items || [];
+    syncSelections();
+    renderClients(state.clients);
+    updateTargetLabels();
+    return;
+  }
+  if (msg.type === "note") {
+    appendNote(msg);
+    return;
+  }
+  if (msg.type === "file") {
+    refreshFiles();
+    const from = msg.from ? ` from ${msg.from}` : "";
+    uploadStatus.textContent = `New file${from}: ${msg.name}`;
+    return;
+  }
+  if (msg.type === "settings") {
+    saveDirLabel.textContent = msg.save_dir || saveDirLabel.textContent;
+    if (msg.requires_code) {
+      codeField.style.display = "flex";
+    }
+    return;
+  }
+}
+
 function disconnect() {
   if (state.ws) {
     state.ws.close();